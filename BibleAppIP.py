@@ -1,12 +1,14 @@
 import tkinter as tk
 from tkinter import messagebox, filedialog
-import json
+import importlib
 import os
-import requests
-import urllib.parse
-import sys
-from bible_lookup import fetch_bible_verse
+from bisect import bisect_left, insort
+from concurrent.futures import ThreadPoolExecutor
+from references import normalize
 
+# esv_client (requests, urllib3, certifi, ...) and interpretation_store
+# (json, sqlite3) are imported on first use, off the Tk thread, so the
+# window paints without waiting for them.
 
 
 # def lookup_verse_gui(self):
@@ -27,17 +29,20 @@ INTERPRETATIONS_FILE = os.path.join(SCRIPT_DIR, "interpretations.json")
 
 
 def load_interpretations():
-    try:
-        with open(INTERPRETATIONS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
+    """Open the store and read every entry. Runs off the Tk thread."""
+    from interpretation_store import open_interpretation_store
+
+    store = open_interpretation_store(INTERPRETATIONS_FILE)
+    return store, store.all()
+
+
+def report_load_errors(store):
+    if not os.path.exists(INTERPRETATIONS_FILE) and len(store) == 0:
         messagebox.showerror(
             "Error", f"interpretations.json not found at:\n{INTERPRETATIONS_FILE}")
-        return {}
-    except json.JSONDecodeError as e:
+    elif store.error is not None:
         messagebox.showerror(
-            "Error", f"interpretations.json is not valid JSON.\n{e}")
-        return {}
+            "Error", f"interpretations.json is not valid JSON.\n{store.error}")
 
 
 # ---------------------------------------------------------
@@ -46,18 +51,12 @@ def load_interpretations():
 # ---------------------------------------------------------
 # Fetch verse (ESV)
 # ---------------------------------------------------------
-ESV_API_KEY = "7580d95a1be11f5097f01d04f98f6d6d999d2768"
-
-headers = {
-    "Authorization": f"Token {ESV_API_KEY}"
-}
-
-
 def fetch_bible_verse(reference):
     """
     Fetch verse text AND ESV footnotes from the ESV API.
     Returns: (verse_text_with_footnotes, source_or_error)
     """
+    import esv_client
 
     params = {
         "q": reference,
@@ -68,12 +67,8 @@ def fetch_bible_verse(reference):
         "include-short-copyright": False,
     }
 
-    url = "https://api.esv.org/v3/passage/text/"
-
     try:
-        resp = requests.get(url, headers=headers, params=params, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
+        data = esv_client.get(params)
     except Exception as e:
         return None, f"ESV API error: {e}"
 
@@ -93,9 +88,157 @@ def fetch_bible_verse(reference):
     return verse_text, "English Standard Version (ESV)"
 
 
+# ---------------------------------------------------------
+# Interpretation list
+# ---------------------------------------------------------
+class ReferenceIndex:
+    """
+    Sorted references with the view the list currently shows: all of
+    them, the ones matching a filter (still sorted), or ranked search
+    results. add() and remove() keep both up to date by bisection
+    instead of rebuilding anything.
+    """
+
+    def __init__(self, references=()):
+        self.items = sorted(references)
+        self.query = ""
+        self.ranked = False
+        self.view = self.items
+
+    def _matches(self, reference):
+        return self.query in reference.lower()
+
+    def add(self, reference):
+        i = bisect_left(self.items, reference)
+        if i < len(self.items) and self.items[i] == reference:
+            return False
+        self.items.insert(i, reference)
+        filtered = self.view is not self.items and not self.ranked
+        if filtered and self._matches(reference):
+            insort(self.view, reference)
+        return True
+
+    def remove(self, reference):
+        i = bisect_left(self.items, reference)
+        if i == len(self.items) or self.items[i] != reference:
+            return False
+        del self.items[i]
+        if self.view is not self.items and reference in self.view:
+            self.view.remove(reference)
+        return True
+
+    def filter(self, query):
+        query = query.strip().lower()
+        # Typing more narrows the last result; no need to rescan all.
+        narrowing = (self.query and query.startswith(self.query)
+                     and not self.ranked)
+        candidates = self.view if narrowing else self.items
+
+        self.query = query
+        self.ranked = False
+        if query:
+            self.view = [ref for ref in candidates if self._matches(ref)]
+        else:
+            self.view = self.items
+
+    def show_ranked(self, references):
+        self.query = ""
+        self.ranked = True
+        self.view = list(references)
+
+
+class VirtualList:
+    """
+    A Listbox that only ever holds the rows on screen. Scrolling moves
+    a window over `items`, so the widget costs the same for ten
+    references as for ten thousand.
+    """
+
+    def __init__(self, parent, rows=10, **options):
+        self.rows = rows
+        self.items = []
+        self.top = 0
+        self.selected = None
+
+        self.listbox = tk.Listbox(parent, height=rows, **options)
+        self.scroll = tk.Scrollbar(parent, command=self.on_scroll)
+
+        self.listbox.bind("<<ListboxSelect>>", self._remember_selection, add="+")
+        self.listbox.bind("<MouseWheel>", self.on_wheel)
+        self.listbox.bind("<Button-4>", lambda e: self.scroll_by(-1))
+        self.listbox.bind("<Button-5>", lambda e: self.scroll_by(1))
+        self.listbox.bind("<Up>", lambda e: self.move_selection(-1))
+        self.listbox.bind("<Down>", lambda e: self.move_selection(1))
+
+    def set_items(self, items, keep_position=False):
+        self.items = items
+        if not keep_position:
+            self.top = 0
+        self.render()
+
+    def render(self):
+        self.top = max(0, min(self.top, len(self.items) - self.rows))
+        window = self.items[self.top:self.top + self.rows]
+
+        self.listbox.delete(0, tk.END)
+        if window:
+            self.listbox.insert(tk.END, *window)
+        if self.selected in window:
+            self.listbox.selection_set(window.index(self.selected))
+
+        total = len(self.items)
+        if total <= self.rows:
+            self.scroll.set(0.0, 1.0)
+        else:
+            self.scroll.set(self.top / total, (self.top + self.rows) / total)
+
+    def _remember_selection(self, event=None):
+        selection = self.listbox.curselection()
+        if selection:
+            self.selected = self.listbox.get(selection[0])
+
+    # -----------------------------------------------------
+    def on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.top = int(float(amount) * len(self.items))
+            self.render()
+        elif unit == "pages":
+            self.scroll_by(int(amount) * self.rows)
+        else:
+            self.scroll_by(int(amount))
+
+    def on_wheel(self, event):
+        self.scroll_by(-1 if event.delta > 0 else 1)
+        return "break"
+
+    def scroll_by(self, rows):
+        self.top += rows
+        self.render()
+        return "break"
+
+    def move_selection(self, step):
+        if self.selected in self.items:
+            position = self.items.index(self.selected) + step
+        else:
+            position = self.top
+        if not 0 <= position < len(self.items):
+            return "break"
+
+        if position < self.top:
+            self.top = position
+        elif position >= self.top + self.rows:
+            self.top = position - self.rows + 1
+        self.selected = self.items[position]
+        self.render()
+        self.listbox.event_generate("<<ListboxSelect>>")
+        return "break"
+
+
 # ---------------------------------------------------------
 # GUI Application
 # ---------------------------------------------------------
+# How often the Tk thread checks on a lookup running in the background.
+LOOKUP_POLL_MS = 30
 
 
 class BibleApp:
@@ -104,7 +247,17 @@ class BibleApp:
         self.root.title("Bible Verse Lookup GUI")
         self.root.minsize(800, 800)
 
-        self.interpretations = load_interpretations()
+        # Filled in by finish_loading() once the window is up.
+        self.store = None
+        self.interpretations = {}
+
+        # Verse lookups (and the initial load) run here so slow I/O
+        # never freezes Tk.
+        self.lookup_pool = ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="lookup")
+        self.lookup_id = 0
+        self.pending_lookup = None
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
 
         # Call AFTER setting title, BEFORE widgets
         self.center_window(800, 800)
@@ -149,6 +302,10 @@ class BibleApp:
             command=self.lookup_verse
         ).grid(row=0, column=2, padx=5)
 
+        self.status_label = tk.Label(
+            lookup_frame, text="", font=("Arial", 10), fg="gray")
+        self.status_label.grid(row=1, column=1, sticky="w", padx=5)
+
         # ============================
         # INTERPRETATION LIST SECTION
         # ============================
@@ -161,21 +318,35 @@ class BibleApp:
         )
         list_frame.pack(fill=tk.X, pady=10)
 
-        self.listbox = tk.Listbox(
-            list_frame, width=40, height=10, font=("Arial", 12))
-        self.listbox.pack(side=tk.LEFT, fill=tk.X)
-
-        scroll = tk.Scrollbar(list_frame)
-        scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        search_frame = tk.Frame(list_frame)
+        search_frame.pack(side=tk.TOP, fill=tk.X, pady=(0, 8))
 
-        self.listbox.config(yscrollcommand=scroll.set)
-        scroll.config(command=self.listbox.yview)
+        tk.Label(search_frame, text="Search:", font=(
+            "Arial", 12)).pack(side=tk.LEFT, padx=5)
+        self.search_entry = tk.Entry(
+            search_frame, width=30, font=("Arial", 12))
+        self.search_entry.pack(side=tk.LEFT, padx=5)
+        # Typing filters references; Return / Search ranks by full text.
+        self.search_entry.bind("<KeyRelease>", self.schedule_filter)
+        self.search_entry.bind("<Return>", self.search_interpretations)
+        self.filter_job = None
 
-        for ref in self.interpretations.keys():
-            self.listbox.insert(tk.END, ref)
+        tk.Button(
+            search_frame,
+            text="Search",
+            command=self.search_interpretations
+        ).pack(side=tk.LEFT, padx=5)
+
+        self.reference_index = ReferenceIndex(self.interpretations)
+        self.reference_list = VirtualList(
+            list_frame, rows=10, width=40, font=("Arial", 12))
+        self.listbox = self.reference_list.listbox
+        self.listbox.pack(side=tk.LEFT, fill=tk.X)
+        self.reference_list.scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.reference_list.set_items(self.reference_index.view)
 
         self.listbox.bind("<<ListboxSelect>>",
-                          self.load_selected_interpretation)
+                          self.load_selected_interpretation, add="+")
 
         # ============================
         # BIBLE VERSE TEXT SECTION
@@ -252,15 +423,79 @@ class BibleApp:
         self.root.update_idletasks()
         self.root.resizable(False, False)
 
+        self.set_busy("Loading interpretations...")
+        loading = self.lookup_pool.submit(load_interpretations)
+        self.root.after(LOOKUP_POLL_MS, self.finish_loading, loading)
+        # Import the ESV client in the background too, so the first
+        # lookup doesn't pay for it.
+        self.root.after_idle(
+            self.lookup_pool.submit, importlib.import_module, "esv_client")
+
+    def finish_loading(self, future):
+        if not future.done():
+            self.root.after(LOOKUP_POLL_MS, self.finish_loading, future)
+            return
+
+        if self.pending_lookup is None:
+            self.set_busy(None)
+        try:
+            self.store, self.interpretations = future.result()
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not open interpretations.\n{e}")
+            return
+
+        report_load_errors(self.store)
+        self.refresh_listbox()
+
+    def store_ready(self):
+        if self.store is None:
+            messagebox.showinfo("Loading", "Interpretations are still loading.")
+            return False
+        return True
+
     # -----------------------------------------------------
 
     def lookup_verse(self):
-        reference = self.verse_entry.get().strip()
+        reference = normalize(self.verse_entry.get())
         if not reference:
             messagebox.showwarning("Warning", "Please enter a verse.")
-        return
+            return
+
+        # A newer lookup supersedes one still in flight: drop it from
+        # the queue if it hasn't started, and ignore its result if it has.
+        if self.pending_lookup is not None:
+            self.pending_lookup.cancel()
+        self.lookup_id += 1
+        future = self.lookup_pool.submit(fetch_bible_verse, reference)
+        self.pending_lookup = future
+
+        self.set_busy(f"Looking up {reference}...")
+        self.root.after(LOOKUP_POLL_MS, self.finish_lookup,
+                        self.lookup_id, reference, future)
+
+    def finish_lookup(self, lookup_id, reference, future):
+        # Runs on the Tk thread via root.after; never touches Tk from
+        # the worker.
+        if lookup_id != self.lookup_id:
+            return
+        if not future.done():
+            self.root.after(LOOKUP_POLL_MS, self.finish_lookup,
+                            lookup_id, reference, future)
+            return
 
-        verse_text, raw_json = fetch_bible_verse(reference)
+        self.pending_lookup = None
+        self.set_busy(None)
+        try:
+            verse_text, raw_json = future.result()
+        except Exception as e:
+            verse_text, raw_json = None, f"Lookup failed: {e}"
+        self.show_verse(reference, verse_text, raw_json)
+
+    def set_busy(self, message):
+        self.status_label.config(text=message or "")
+        self.root.config(cursor="watch" if message else "")
+
+    def show_verse(self, reference, verse_text, raw_json):
         interpretation = self.interpretations.get(reference)
 
         self.text_area.delete("1.0", tk.END)
@@ -268,28 +503,29 @@ class BibleApp:
         if verse_text is None:
             self.text_area.insert(tk.END, "Error fetching verse.\n\n")
             self.text_area.insert(tk.END, f"RAW JSON:\n{raw_json}\n")
-        return
+            return
 
         # Display verse text
         self.text_area.insert(tk.END, f"Bible Verse: {reference}\n\n")
         self.text_area.insert(tk.END, f"VERSE:\n{verse_text}\n\n")
 
-    # Display JSON
+        # Display JSON
         self.text_area.insert(tk.END, "JSON RECORD:\n")
         self.text_area.insert(tk.END, f"{raw_json}\n\n")
 
         # Display interpretation
         if interpretation:
             self.text_area.insert(
-            tk.END,
-            f"INTERPRETATION:\n{interpretation.get('interpretation', 'No interpretation text found.')}\n"
-        )
+                tk.END,
+                f"INTERPRETATION:\n{interpretation.get('interpretation', 'No interpretation text found.')}\n"
+            )
         else:
             self.text_area.insert(tk.END, "No interpretation found.\n")
 
-
-
-        # Lock size AFTER widgets are created
+    def close(self):
+        # Don't wait for lookups nobody will see.
+        self.lookup_pool.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
 
     # -----------------------------------------------------
 
@@ -323,7 +559,7 @@ class BibleApp:
 
     # -----------------------------------------------------
     def save_interpretation(self):
-        reference = self.verse_entry.get().strip()
+        reference = normalize(self.verse_entry.get())
         if not reference:
             messagebox.showwarning("Warning", "Enter a verse reference first.")
             return
@@ -341,7 +577,7 @@ class BibleApp:
             messagebox.showinfo("Saved", f"Saved to {save_path}")
 
             def add_interpretation(self):
-                reference = self.verse_entry.get().strip()
+                reference = normalize(self.verse_entry.get())
                 text = self.interpretation_box.get("1.0", tk.END).strip()
 
             if not reference or not text:
@@ -354,13 +590,13 @@ class BibleApp:
                 "interpretation": text
             }
 
-            self.save_interpretations_to_file()
-            self.refresh_listbox()
+            self.save_interpretation_change(reference)
+            self.refresh_listbox(reference)
             messagebox.showinfo(
                 "Saved", f"Added interpretation for {reference}")
 
             def add_interpretation(self):
-                reference = self.verse_entry.get().strip()
+                reference = normalize(self.verse_entry.get())
                 text = self.interpretation_box.get("1.0", tk.END).strip()
 
             if not reference or not text:
@@ -373,12 +609,14 @@ class BibleApp:
             "interpretation": text
         }
 
-        self.save_interpretations_to_file()
-        self.refresh_listbox()
+        self.save_interpretation_change(reference)
+        self.refresh_listbox(reference)
         messagebox.showinfo("Saved", f"Added interpretation for {reference}")
 
     def add_interpretation(self):
-        reference = self.verse_entry.get().strip()
+        if not self.store_ready():
+            return
+        reference = normalize(self.verse_entry.get())
         text = self.interpretation_box.get("1.0", tk.END).strip()
 
         if not reference or not text:
@@ -390,17 +628,19 @@ class BibleApp:
             "verse": reference,
             "interpretation": text
         }
-        self.save_interpretations_to_file()
-        self.refresh_listbox()
+        self.save_interpretation_change(reference)
+        self.refresh_listbox(reference)
         messagebox.showinfo("Saved", f"Added interpretation for {reference}")
 
     def delete_interpretation(self):
-        reference = self.verse_entry.get().strip()
+        if not self.store_ready():
+            return
+        reference = normalize(self.verse_entry.get())
 
         if reference in self.interpretations:
             del self.interpretations[reference]
-            self.save_interpretations_to_file()
-            self.refresh_listbox()
+            self.save_interpretation_change(reference)
+            self.refresh_listbox(reference)
             self.interpretation_box.delete("1.0", tk.END)
             messagebox.showinfo(
                 "Deleted", f"Deleted interpretation for {reference}")
@@ -408,17 +648,62 @@ class BibleApp:
             messagebox.showwarning(
                 "Warning", "No interpretation found to delete.")
 
-    def save_interpretations_to_file(self):
-        with open(INTERPRETATIONS_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.interpretations, f, indent=4)
+    def save_interpretation_change(self, reference):
+        # One journal append per edit instead of rewriting the whole file.
+        entry = self.interpretations.get(reference)
+        if entry is None:
+            self.store.delete(reference)
+        else:
+            self.store.set(reference, entry.get("interpretation", ""))
 
-    def refresh_listbox(self):
-        self.listbox.delete(0, tk.END)
-        for ref in sorted(self.interpretations.keys()):
-            self.listbox.insert(tk.END, ref)
+    def search_interpretations(self, event=None):
+        query = self.search_entry.get().strip()
+        if not query:
+            self.apply_filter()
+            return
+
+        # Ranked full-text matches from the store's index
+        if not self.store_ready():
+            return
+        self.reference_index.show_ranked(
+            ref for ref, _, _ in self.store.search(query, limit=200))
+        self.reference_list.set_items(self.reference_index.view)
+
+    def schedule_filter(self, event=None):
+        query = self.search_entry.get().strip().lower()
+        if query == self.reference_index.query and not self.reference_index.ranked:
+            return  # e.g. arrow keys: nothing to refilter
+        if event is not None and event.keysym == "Return":
+            return
+        # Filter once typing pauses, not on every keystroke.
+        if self.filter_job is not None:
+            self.root.after_cancel(self.filter_job)
+        self.filter_job = self.root.after(150, self.apply_filter)
+
+    def apply_filter(self):
+        self.filter_job = None
+        self.reference_index.filter(self.search_entry.get())
+        self.reference_list.set_items(self.reference_index.view)
+
+    def refresh_listbox(self, reference=None):
+        """
+        Show a change to the list. With a reference, only that entry
+        is added or removed; otherwise the whole index is rebuilt.
+        """
+        if reference is None:
+            self.reference_index = ReferenceIndex(self.interpretations)
+            self.reference_index.filter(self.search_entry.get())
+        elif reference in self.interpretations:
+            self.reference_index.add(reference)
+        else:
+            self.reference_index.remove(reference)
+        self.reference_list.set_items(
+            self.reference_index.view, keep_position=reference is not None)
 
     def update_interpretation(self):
-        reference = self.verse_entry.get().strip()
+        if not self.store_ready():
+            return
+        reference = normalize(self.verse_entry.get())
         text = self.interpretation_box.get("1.0", tk.END).strip()
 
         if reference not in self.interpretations:
@@ -427,7 +712,7 @@ class BibleApp:
             return
 
         self.interpretations[reference]["interpretation"] = text
-        self.save_interpretations_to_file()
+        self.save_interpretation_change(reference)
         messagebox.showinfo(
             "Updated", f"Updated interpretation for {reference}")
 
@@ -0,0 +1,187 @@
+import atexit
+import json
+import os
+import queue
+import threading
+
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: single process, no locking needed
+    fcntl = None
+
+# One JSON object per line; warmup.py reads the "reference" field back.
+ACCESS_LOG = os.environ.get("ACCESS_LOG", "requests.jsonl")
+
+DROPPED = metrics.counter(
+    "bible_access_log_dropped_total",
+    "Access log records dropped because the writer fell behind.")
+
+
+# -----------------------------
+#  ACCESS LOG
+# -----------------------------
+class AccessLog:
+    """
+    JSON-lines request log that never writes on the request thread.
+
+    log() only puts the record on a bounded in-memory queue. A writer
+    thread drains whatever has queued up and appends it with one
+    write(); under load, batches grow instead of writes multiplying.
+    If the queue is full the record is dropped (and counted) rather
+    than slowing the request.
+
+    When the file passes max_bytes it is rotated to path.1 ... path.N.
+    Every gunicorn worker appends to the same file with O_APPEND; an
+    flock makes one of them rotate, and the others reopen.
+    """
+
+    def __init__(self, path, max_bytes=50 * 1024 * 1024, backups=5,
+                 max_queue=10000, batch_size=1000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.batch_size = batch_size
+        self._max_queue = max_queue
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._fd = None
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        atexit.register(self.close)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # The writer thread did not survive the fork; start afresh.
+        self._queue = queue.Queue(maxsize=self._max_queue)
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._fd = None
+
+    def log(self, record):
+        if self._writer is None:
+            self._start_writer()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            DROPPED.inc()
+
+    def _start_writer(self):
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._write_loop, name="access-log", daemon=True)
+                self._writer.start()
+
+    # -----------------------------
+    #  WRITER THREAD
+    # -----------------------------
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            records = [record for record in batch if record is not None]
+            if records:
+                try:
+                    self._write(records)
+                except OSError:
+                    self.dropped += len(records)
+                    DROPPED.inc(len(records))
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, records):
+        data = "".join(
+            json.dumps(record, separators=(",", ":")) + "\n"
+            for record in records).encode("utf-8")
+
+        fd = self._open()
+        os.write(fd, data)
+        self.written += len(records)
+
+        if os.fstat(fd).st_size >= self.max_bytes:
+            self._rotate()
+
+    def _open(self):
+        # Reopen if another process rotated the file out from under us.
+        if self._fd is not None:
+            try:
+                current = os.stat(self.path).st_ino
+            except OSError:
+                current = None
+            if current != os.fstat(self._fd).st_ino:
+                os.close(self._fd)
+                self._fd = None
+
+        if self._fd is None:
+            self._fd = os.open(
+                self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        return self._fd
+
+    def _rotate(self):
+        fd = self._fd
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            # Someone else may have rotated while we waited for the lock.
+            try:
+                if os.stat(self.path).st_ino != os.fstat(fd).st_ino:
+                    return
+            except FileNotFoundError:
+                return
+            for i in range(self.backups - 1, 0, -1):
+                older = f"{self.path}.{i}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.path}.{i + 1}")
+            if self.backups > 0:
+                os.replace(self.path, f"{self.path}.1")
+            else:
+                os.truncate(self.path, 0)
+                return
+            self.rotations += 1
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    # -----------------------------
+    #  SHUTDOWN
+    # -----------------------------
+    def flush(self):
+        """Block until everything logged so far is written."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self, timeout=5.0):
+        writer = self._writer
+        if writer is None or not writer.is_alive():
+            return
+        self._queue.put(None)
+        writer.join(timeout)
+        self._writer = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def open_access_log(path=ACCESS_LOG):
+    """The configured AccessLog, or None when ACCESS_LOG is empty."""
+    if not path:
+        return None
+    return AccessLog(
+        path,
+        max_bytes=int(os.environ.get("ACCESS_LOG_MAX_BYTES", 50 * 1024 * 1024)),
+        backups=int(os.environ.get("ACCESS_LOG_BACKUPS", 5)),
+    )
@@ -0,0 +1,292 @@
+import asyncio
+import json
+import os
+import time
+from urllib.parse import parse_qs
+
+from werkzeug.http import parse_accept_header
+
+import esv_client
+import metrics
+from passage_cache import make_key
+from quota import BACKGROUND, INTERACTIVE
+from references import InvalidReference, normalize
+from server import (ESV_PARAMS, REQUEST_SECONDS, REQUESTS, access_log,
+                    format_passage, interpretation_store, local_corpus,
+                    page_assets, passage_cache)
+from singleflight import AsyncSingleFlight
+
+# -----------------------------
+#  ASYNC SERVER
+# -----------------------------
+# Same routes as server.py, served by one event loop per worker:
+#
+#     uvicorn asgi_server:app --workers 4
+#
+# A lookup waiting on ESV is a suspended coroutine rather than a pinned
+# gunicorn worker, so thousands can wait on upstream at once. The cache,
+# interpretation store and reference parser are shared with server.py.
+
+
+# Concurrent lookups of the same reference await one upstream call.
+single_flight = AsyncSingleFlight()
+revalidating = set()
+
+
+async def fetch_bible_verse(reference):
+    if local_corpus is not None:
+        try:
+            verse_text = local_corpus.passage_text(reference)
+        except InvalidReference:
+            verse_text = None
+        return verse_text if verse_text is not None else "Verse not found."
+
+    # Memory hits take microseconds; a miss may read the local SQLite
+    # cache, which is fast enough to stay on the loop.
+    key = make_key(reference, ESV_PARAMS)
+    cached = passage_cache.get(key)
+    if cached is not None:
+        return cached
+    return await fetch_missing_verse(reference, key)
+
+
+async def fetch_missing_verse(reference, key):
+    """fetch_bible_verse after a passage cache miss under key."""
+    try:
+        verse_text = await single_flight.do(
+            key, lambda: fetch_upstream(reference, key))
+    except Exception as e:
+        # Serve the last good copy and refresh it in the background.
+        stale = passage_cache.get_stale(key)
+        if stale is not None:
+            revalidate(reference, key)
+            return stale
+        return f"Error fetching verse: {e}"
+
+    if verse_text is None:
+        return "Verse not found."
+    return verse_text
+
+
+async def fetch_upstream(reference, key, priority=INTERACTIVE):
+    data = await esv_client.aget(dict(ESV_PARAMS, q=reference), priority)
+
+    passages = data.get("passages", [])
+    if not passages:
+        return None
+
+    verse_text = format_passage(passages[0], data.get("footnotes", []))
+    await asyncio.to_thread(passage_cache.set, key, verse_text)
+    return verse_text
+
+
+def revalidate(reference, key):
+    if key in revalidating:
+        return
+    revalidating.add(key)
+
+    async def run():
+        try:
+            # Its own flight: a user's lookup must not end up waiting
+            # on a background call, or on background quota.
+            await single_flight.do(
+                (BACKGROUND, key),
+                lambda: fetch_upstream(reference, key, BACKGROUND))
+        except Exception:
+            pass
+        finally:
+            revalidating.discard(key)
+
+    asyncio.ensure_future(run())
+
+
+# -----------------------------
+#  RESPONSES
+# -----------------------------
+async def send_response(send, status, body, content_type, headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", content_type.encode("latin-1")),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_json(send, payload, status=200, headers=()):
+    body = json.dumps(payload).encode("utf-8")
+    await send_response(send, status, body, "application/json", headers)
+
+
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+# -----------------------------
+#  ROUTES
+# -----------------------------
+async def index(scope, receive, send):
+    asset = page_assets.get("index.html")
+    if asset is None:
+        await send_json(send, {"error": "Not found"}, 404)
+        return
+
+    request_headers = dict(scope.get("headers", []))
+    # Parsed the way Flask does for server.py, so "gzip;q=0" refuses gzip.
+    accept = parse_accept_header(
+        request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+
+    encoding = asset.encoding_for(accept.quality)
+    etag = f'"{asset.etag}-{encoding}"'.encode("latin-1")
+    headers = [(b"vary", b"Accept-Encoding"), (b"cache-control", b"no-cache"),
+               (b"etag", etag)]
+    if encoding != "identity":
+        headers.append((b"content-encoding", encoding.encode("latin-1")))
+
+    if etag in request_headers.get(b"if-none-match", b""):
+        await send_response(send, 304, b"", asset.content_type, headers)
+        return
+    await send_response(send, 200, asset.bodies[encoding],
+                        asset.content_type, headers)
+
+
+async def lookup(scope, receive, send):
+    args = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    reference = normalize(args.get("reference", [""])[0])
+
+    key = make_key(reference, ESV_PARAMS)
+    if local_corpus is None:
+        verse_text = passage_cache.get(key)
+    else:
+        verse_text = await fetch_bible_verse(reference)
+    scope["access"] = {
+        "reference": reference,
+        "cache": ("local" if local_corpus is not None
+                  else "miss" if verse_text is None else "hit"),
+        "upstream_ms": 0,
+    }
+
+    if verse_text is None:
+        started = time.perf_counter()
+        verse_text = await fetch_missing_verse(reference, key)
+        scope["access"]["upstream_ms"] = round(
+            (time.perf_counter() - started) * 1000, 2)
+    interp = interpretation_store.get_interpretation(reference)
+
+    await send_json(send, {
+        "reference": reference,
+        "verse": reference,
+        "verse_text": verse_text,
+        "interpretation": interp,
+    }, headers=[(b"x-cache", scope["access"]["cache"].encode("latin-1"))])
+
+
+async def save_interpretation(scope, receive, send):
+    try:
+        data = json.loads(await read_body(receive))
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        data = {}
+    reference = data.get("reference")
+    interpretation = data.get("interpretation")
+
+    if not (isinstance(reference, str) and reference.strip()
+            and isinstance(interpretation, str)):
+        await send_json(send, {
+            "error": "Expected a reference and interpretation, both strings."
+        }, 400)
+        return
+
+    reference = normalize(reference)
+    scope["access"] = {"reference": reference, "chars": len(interpretation)}
+
+    # Store writes touch disk; keep them off the event loop.
+    await asyncio.to_thread(interpretation_store.set, reference, interpretation)
+    await send_json(send, {"status": "ok"})
+
+
+async def metrics_route(scope, receive, send):
+    body = await asyncio.to_thread(metrics.registry.render)
+    await send_response(send, 200, body.encode("utf-8"), metrics.CONTENT_TYPE)
+
+
+ROUTES = {
+    ("GET", "/"): index,
+    ("GET", "/lookup"): lookup,
+    ("GET", "/metrics"): metrics_route,
+    ("POST", "/save_interpretation"): save_interpretation,
+}
+
+
+# -----------------------------
+#  ASGI ENTRY POINT
+# -----------------------------
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await esv_client.aclose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+
+    method = scope["method"]
+    handler = ROUTES.get((method, scope["path"]))
+    if handler is None and method == "HEAD":
+        handler = ROUTES.get(("GET", scope["path"]))
+
+    started = time.perf_counter()
+    status = []
+
+    async def send_recording(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+        await send(message)
+
+    known = any(path == scope["path"] for _, path in ROUTES)
+    if handler is not None:
+        await handler(scope, receive, send_recording)
+    elif known:
+        await send_json(send_recording, {"error": "Method not allowed"}, 405)
+    else:
+        await send_json(send_recording, {"error": "Not found"}, 404)
+
+    route = scope["path"] if known else "unmatched"
+    REQUEST_SECONDS.observe(time.perf_counter() - started,
+                            method=method, route=route)
+    REQUESTS.inc(method=method, route=route,
+                 status=status[0] if status else 500)
+
+    record = scope.get("access")
+    if record is not None and access_log is not None:
+        elapsed = time.perf_counter() - started
+        record.update(
+            ts=round(time.time() - elapsed, 3),  # when it arrived
+            method=method,
+            route=route,
+            status=status[0] if status else 500,
+            total_ms=round(elapsed * 1000, 2),
+        )
+        access_log.log(record)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 5005)))
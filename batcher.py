@@ -0,0 +1,86 @@
+import threading
+from concurrent.futures import Future
+
+
+# -----------------------------
+#  UPSTREAM MICRO-BATCHING
+# -----------------------------
+class _Batch:
+    def __init__(self):
+        self.futures = {}
+        self.full = threading.Event()
+
+
+class UpstreamBatcher:
+    """
+    Collects the distinct references requested within a short window
+    and resolves them with one call to fetch_many(references), which
+    must return one result (or exception) per reference, in order.
+
+    The first caller of a window acts as the leader: it waits out the
+    window, sends the batch and fans the results back to every waiter.
+    Callers asking for a reference already in the open batch share its
+    result instead of adding a duplicate. A batch that reaches
+    max_batch is closed at once, and the next caller leads a new one.
+    """
+
+    def __init__(self, fetch_many, window=0.005, max_batch=20):
+        self.fetch_many = fetch_many
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._open = None
+        self.batches = 0
+        self.batched_references = 0
+
+    def submit(self, reference):
+        """Return the result for reference, or raise its exception."""
+        with self._lock:
+            batch = self._open
+            future = batch.futures.get(reference) if batch is not None else None
+            leader = False
+            if future is None:
+                if batch is None:
+                    batch = self._open = _Batch()
+                    leader = True
+                future = Future()
+                batch.futures[reference] = future
+                if len(batch.futures) >= self.max_batch:
+                    self._open = None
+                    batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            self._flush(batch)
+
+        return future.result()
+
+    def _flush(self, batch):
+        with self._lock:
+            if self._open is batch:
+                self._open = None
+            self.batches += 1
+            self.batched_references += len(batch.futures)
+
+        references = list(batch.futures)
+        try:
+            results = self.fetch_many(references)
+        except Exception as e:
+            for future in batch.futures.values():
+                future.set_exception(e)
+            return
+
+        for reference, result in zip(references, results):
+            future = batch.futures[reference]
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "batched_references": self.batched_references,
+                "window_ms": self.window * 1000,
+            }
@@ -0,0 +1,178 @@
+"""
+Local stand-in for api.esv.org's /v3/passage/text/ endpoint.
+
+    python bench/esv_stub.py --port 8765 --latency-ms 80 --error-rate 0.01
+    ESV_API_URL=http://127.0.0.1:8765/v3/passage/text/ gunicorn server:app
+
+Answers like ESV does: one entry in "passages" per passage in q
+("John 3:16; Rom 8:28"), unknown references silently dropped, and
+each passage's footnotes at the end of its own text. Latency is
+log-normal around --latency-ms; --error-rate of calls fail with
+--error-status.
+
+GET /stats returns the calls served so far, so a benchmark can count
+upstream calls; POST /stats/reset zeroes them.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from references import InvalidReference, format_passage, parse  # noqa: E402
+
+PASSAGE_PATH = "/v3/passage/text/"
+
+
+# -----------------------------
+#  FAKE PASSAGES
+# -----------------------------
+def passage_text(passage):
+    """Deterministic filler shaped like ESV text output."""
+    lines = []
+    for segment in passage.segments:
+        first = segment.start_verse or 1
+        count = 10  # whole chapters and chapter-spanning ranges
+        if segment.end_chapter == segment.start_chapter and segment.end_verse:
+            count = min(segment.end_verse - first + 1, 50)
+        for verse in range(first, first + count):
+            lines.append(f"[{verse}] Text of {passage.book} "
+                         f"{segment.start_chapter}:{verse}, "
+                         "as it would read in the ESV.(1)")
+    lines += ["", "Footnotes", "",
+              f"(1) Or a footnote on {format_passage(passage)}"]
+    return "\n".join(lines) + "\n"
+
+
+def answer(query):
+    """The ESV-style JSON body for q=query."""
+    passages = []
+    canonical = []
+    for part in query.split(";"):
+        try:
+            parsed = parse(part)
+        except InvalidReference:
+            continue  # ESV drops what it can't resolve
+        for passage in parsed:
+            canonical.append(format_passage(passage))
+            passages.append(passage_text(passage))
+
+    return {
+        "query": query,
+        "canonical": "; ".join(canonical),
+        "passages": passages,
+    }
+
+
+# -----------------------------
+#  HTTP SERVER
+# -----------------------------
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.references = 0
+            self.errors = 0
+
+    def record(self, references, error):
+        with self._lock:
+            self.calls += 1
+            self.references += references
+            self.errors += error
+
+    def as_dict(self):
+        with self._lock:
+            return {"calls": self.calls, "references": self.references,
+                    "errors": self.errors}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/stats":
+            self.send_json(200, self.server.stats.as_dict())
+            return
+        if url.path != PASSAGE_PATH:
+            self.send_json(404, {"detail": "Not found."})
+            return
+
+        options = self.server.options
+        query = parse_qs(url.query).get("q", [""])[0]
+
+        latency = options.latency_ms / 1000
+        if options.latency_sigma > 0:
+            latency *= random.lognormvariate(0, options.latency_sigma)
+        time.sleep(latency)
+
+        failed = random.random() < options.error_rate
+        self.server.stats.record(len(query.split(";")), failed)
+        if failed:
+            self.send_json(options.error_status, {"detail": "Stub error."})
+        else:
+            self.send_json(200, answer(query))
+
+    def do_POST(self):
+        if urlsplit(self.path).path == "/stats/reset":
+            self.server.stats.reset()
+            self.send_json(200, self.server.stats.as_dict())
+        else:
+            self.send_json(404, {"detail": "Not found."})
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.options.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(options):
+    server = ThreadingHTTPServer((options.host, options.port), StubHandler)
+    server.daemon_threads = True
+    server.options = options
+    server.stats = Stats()
+    return server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Local stand-in for the ESV passage API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=80,
+                        help="median upstream latency (default 80)")
+    parser.add_argument("--latency-sigma", type=float, default=0.5,
+                        help="log-normal spread; 0 for a fixed latency")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of calls that fail (default 0)")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    options = parse_args()
+    server = make_server(options)
+    print(f"ESV stub on http://{options.host}:{server.server_port}{PASSAGE_PATH}",
+          flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
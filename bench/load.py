@@ -0,0 +1,299 @@
+"""
+End-to-end /lookup load benchmark against the local ESV stub.
+
+    python bench/load.py --workers 4 --concurrency 32 --duration 20
+
+Starts bench/esv_stub.py and `gunicorn server:app` (pointed at the stub,
+with a fresh cache and quota limits out of the way), drives /lookup
+from --concurrency keep-alive clients over a Zipf-skewed mix of
+references, and reports req/s, latency percentiles and how many calls
+reached upstream. --json writes the same report for CI, and
+--max-p99-ms / --min-rps turn it into a pass/fail regression gate.
+
+--url benchmarks an already running server instead (upstream counts
+then need --stub-url).
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote, urlsplit
+from urllib.request import Request, urlopen
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from references import BOOKS  # noqa: E402
+
+
+# -----------------------------
+#  STATISTICS
+# -----------------------------
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1,
+                      int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies):
+    """p50/p95/p99/max in milliseconds for latencies in seconds."""
+    ordered = sorted(latencies)
+    return {
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "max_ms": round((ordered[-1] if ordered else 0) * 1000, 2),
+    }
+
+
+# -----------------------------
+#  REFERENCE MIX
+# -----------------------------
+def reference_pool(distinct, seed=0):
+    """`distinct` random single-verse references, fixed by seed."""
+    rng = random.Random(seed)
+    pool = set()
+    while len(pool) < distinct:
+        book, chapters, _ = rng.choice(BOOKS)
+        pool.add(f"{book} {rng.randint(1, chapters)}:{rng.randint(1, 20)}")
+    return sorted(pool)
+
+
+def zipf_weights(n, s):
+    """Rank r gets weight 1/r**s: a few references dominate, like real traffic."""
+    return [1 / (rank ** s) for rank in range(1, n + 1)]
+
+
+# -----------------------------
+#  PROCESSES
+# -----------------------------
+def wait_for(url, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urlopen(url, timeout=1):
+                return
+        except Exception:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{url} did not come up")
+            time.sleep(0.1)
+
+
+def get_json(url, method="GET"):
+    with urlopen(Request(url, method=method), timeout=5) as resp:
+        return json.load(resp)
+
+
+def start_stub(options):
+    command = [sys.executable, os.path.join(ROOT, "bench", "esv_stub.py"),
+               "--port", str(options.stub_port),
+               "--latency-ms", str(options.latency_ms),
+               "--latency-sigma", str(options.latency_sigma),
+               "--error-rate", str(options.error_rate)]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    stub_url = f"http://127.0.0.1:{options.stub_port}"
+    wait_for(stub_url + "/stats")
+    return process, stub_url
+
+
+def start_server(options, stub_url, workdir):
+    env = dict(
+        os.environ,
+        ESV_API_URL=stub_url + "/v3/passage/text/",
+        # The stub has no quota; keep ours from shaping the result.
+        ESV_QUOTA_PER_MINUTE="100000000",
+        ESV_QUOTA_PER_HOUR="100000000",
+        ESV_QUOTA_PER_DAY="100000000",
+        PASSAGE_CACHE_DB=os.path.join(workdir, "passage_cache.sqlite3"),
+        INTERPRETATIONS_DB=os.path.join(workdir, "interpretations.sqlite3"),
+        METRICS_DIR=os.path.join(workdir, "metrics"),
+        ACCESS_LOG=os.path.join(workdir, "requests.jsonl"),
+        WARMUP="0",
+        WEB_CONCURRENCY=str(options.workers),
+    )
+    command = [sys.executable, "-m", "gunicorn",
+               "-c", os.path.join(ROOT, "gunicorn.conf.py"),
+               "-w", str(options.workers),
+               "-b", f"127.0.0.1:{options.port}",
+               "--log-level", "warning"]
+    # Unless asked otherwise, run what the Procfile deploys.
+    if options.worker_class:
+        command += ["-k", options.worker_class]
+    if options.threads:
+        command += ["--threads", str(options.threads)]
+    command.append("server:app")
+    process = subprocess.Popen(command, cwd=ROOT, env=env)
+    url = f"http://127.0.0.1:{options.port}"
+    wait_for(url + "/quota")
+    return process, url
+
+
+# -----------------------------
+#  LOAD
+# -----------------------------
+def drive(url, references, weights, concurrency, duration, seed=0):
+    """
+    Hammer /lookup from `concurrency` keep-alive clients for `duration`
+    seconds. Returns (latencies in seconds, {status: count}, elapsed).
+    """
+    target = urlsplit(url)
+    deadline = time.monotonic() + duration
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def client(n):
+        rng = random.Random(seed + n)
+        conn = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+        mine = []
+        codes = {}
+        while time.monotonic() < deadline:
+            reference = rng.choices(references, weights)[0]
+            started = time.perf_counter()
+            try:
+                conn.request("GET", "/lookup?reference=" + quote(reference))
+                resp = conn.getresponse()
+                resp.read()
+                status = resp.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(
+                    target.hostname, target.port, timeout=30)
+                status = "error"
+            mine.append(time.perf_counter() - started)
+            codes[status] = codes.get(status, 0) + 1
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            for status, count in codes.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=client, args=(n,))
+               for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, time.monotonic() - started
+
+
+def run(options):
+    references = reference_pool(options.distinct, options.seed)
+    weights = zipf_weights(len(references), options.zipf)
+
+    processes = []
+    workdir = tempfile.mkdtemp(prefix="bible-bench-")
+    try:
+        stub_url = options.stub_url
+        if options.url:
+            url = options.url
+        else:
+            if stub_url is None:
+                stub, stub_url = start_stub(options)
+                processes.append(stub)
+            server, url = start_server(options, stub_url, workdir)
+            processes.append(server)
+
+        before = get_json(stub_url + "/stats") if stub_url else None
+        latencies, statuses, elapsed = drive(
+            url, references, weights, options.concurrency, options.duration,
+            options.seed)
+        after = get_json(stub_url + "/stats") if stub_url else None
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "requests": len(latencies),
+        "seconds": round(elapsed, 2),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "statuses": {str(k): v for k, v in sorted(statuses.items(), key=str)},
+        **summarize(latencies),
+        "workers": options.workers,
+        "concurrency": options.concurrency,
+        "distinct_references": len(references),
+    }
+    if before is not None:
+        report["upstream_calls"] = after["calls"] - before["calls"]
+        report["upstream_references"] = after["references"] - before["references"]
+        report["upstream_errors"] = after["errors"] - before["errors"]
+    return report
+
+
+def print_report(report):
+    print(f"{report['requests']} requests in {report['seconds']}s "
+          f"({report['concurrency']} clients, {report['workers']} workers)")
+    print(f"  throughput   {report['rps']} req/s")
+    print(f"  latency      p50 {report['p50_ms']} ms   p95 {report['p95_ms']} ms   "
+          f"p99 {report['p99_ms']} ms   max {report['max_ms']} ms")
+    print(f"  statuses     {report['statuses']}")
+    if "upstream_calls" in report:
+        print(f"  upstream     {report['upstream_calls']} calls for "
+              f"{report['upstream_references']} references "
+              f"({report['upstream_errors']} errors)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="End-to-end /lookup load benchmark.")
+    parser.add_argument("--duration", type=float, default=20, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="keep-alive client threads (default 16)")
+    parser.add_argument("--distinct", type=int, default=500,
+                        help="distinct references in the mix (default 500)")
+    parser.add_argument("--zipf", type=float, default=1.1,
+                        help="skew of the mix; 0 for uniform (default 1.1)")
+    parser.add_argument("--seed", type=int, default=0)
+
+    server = parser.add_argument_group("server")
+    server.add_argument("--url", help="benchmark this running server instead")
+    server.add_argument("--port", type=int, default=8766)
+    server.add_argument("--workers", type=int, default=4)
+    server.add_argument("--worker-class",
+                        help="gunicorn -k (default: as deployed)")
+    server.add_argument("--threads", type=int,
+                        help="gunicorn --threads (default: as deployed)")
+
+    stub = parser.add_argument_group("ESV stub")
+    stub.add_argument("--stub-url", help="use this running stub")
+    stub.add_argument("--stub-port", type=int, default=8765)
+    stub.add_argument("--latency-ms", type=float, default=80)
+    stub.add_argument("--latency-sigma", type=float, default=0.5)
+    stub.add_argument("--error-rate", type=float, default=0.0)
+
+    gate = parser.add_argument_group("regression gate")
+    gate.add_argument("--json", help="also write the report to this file")
+    gate.add_argument("--max-p99-ms", type=float)
+    gate.add_argument("--min-rps", type=float)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    options = parse_args()
+    report = run(options)
+    print_report(report)
+
+    if options.json:
+        with open(options.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+
+    failures = []
+    if options.max_p99_ms is not None and report["p99_ms"] > options.max_p99_ms:
+        failures.append(f"p99 {report['p99_ms']} ms > {options.max_p99_ms} ms")
+    if options.min_rps is not None and report["rps"] < options.min_rps:
+        failures.append(f"{report['rps']} req/s < {options.min_rps} req/s")
+    if failures:
+        sys.exit("FAIL: " + "; ".join(failures))
@@ -0,0 +1,208 @@
+"""
+Replay recorded traffic from requests.jsonl against a running server.
+
+    python bench/replay.py requests.jsonl --url http://127.0.0.1:5005 --speed 10
+
+Re-issues every recorded /lookup at its original offset divided by
+--speed (1 = real time, 10 = ten times faster, 0 = as fast as
+--concurrency allows), then reports latency percentiles per route,
+the cache hit ratio seen in X-Cache, and how far behind schedule the
+server fell.
+
+Only lookups are replayed by default. --saves also replays
+/save_interpretation, with filler text of the recorded length that
+overwrites the stored interpretations: use it against a staging
+server only.
+"""
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlsplit
+
+from load import summarize
+
+ROUTES = ("/lookup", "/save_interpretation")
+
+
+# -----------------------------
+#  RECORDED TRAFFIC
+# -----------------------------
+def read_records(paths, saves=False, limit=None):
+    """Replayable access log records from the given files, oldest first."""
+    routes = ROUTES if saves else ROUTES[:1]
+    records = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if (isinstance(record, dict) and record.get("route") in routes
+                        and record.get("reference")
+                        and isinstance(record.get("ts"), (int, float))):
+                    records.append(record)
+
+    records.sort(key=lambda record: record["ts"])
+    return records[:limit] if limit else records
+
+
+# -----------------------------
+#  REPLAY
+# -----------------------------
+class Replayer:
+    def __init__(self, url, concurrency):
+        self.target = urlsplit(url)
+        self.pool = ThreadPoolExecutor(max_workers=concurrency)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.results = []
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(
+                self.target.hostname, self.target.port, timeout=30)
+        return conn
+
+    def _send(self, record):
+        if record["route"] == "/lookup":
+            args = ("GET", "/lookup?reference=" + quote(record["reference"]))
+            headers = {}
+        else:
+            body = json.dumps({
+                "reference": record["reference"],
+                "interpretation": "x" * int(record.get("chars", 100)),
+            })
+            args = ("POST", "/save_interpretation", body)
+            headers = {"Content-Type": "application/json"}
+
+        started = time.perf_counter()
+        conn = self._connection()
+        try:
+            conn.request(*args, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            status, cache = resp.status, resp.getheader("X-Cache")
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self._local.conn = None
+            status, cache = "error", None
+        return status, cache, time.perf_counter() - started
+
+    def submit(self, record, due):
+        def run():
+            lag = max(0.0, time.perf_counter() - due)
+            status, cache, latency = self._send(record)
+            with self._lock:
+                self.results.append((record["route"], status, cache, latency, lag))
+
+        self.pool.submit(run)
+
+    def replay(self, records, speed):
+        """Send records at their recorded offsets divided by speed."""
+        if not records:
+            return 0.0
+        first = records[0]["ts"]
+        started = time.perf_counter()
+
+        for record in records:
+            due = started
+            if speed > 0:
+                due += (record["ts"] - first) / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            self.submit(record, due)
+
+        self.pool.shutdown(wait=True)
+        return time.perf_counter() - started
+
+
+# -----------------------------
+#  REPORT
+# -----------------------------
+def report(records, results, elapsed):
+    by_route = defaultdict(list)
+    statuses = defaultdict(Counter)
+    caches = Counter()
+    lags = []
+    for route, status, cache, latency, lag in results:
+        by_route[route].append(latency)
+        statuses[route][str(status)] += 1
+        if cache:
+            caches[cache] += 1
+        lags.append(lag)
+
+    recorded = Counter(record["cache"] for record in records
+                       if record["route"] == "/lookup" and record.get("cache"))
+
+    return {
+        "requests": len(results),
+        "seconds": round(elapsed, 2),
+        "rps": round(len(results) / elapsed, 1) if elapsed else 0.0,
+        "routes": {
+            route: dict(count=len(latencies), statuses=dict(statuses[route]),
+                        **summarize(latencies))
+            for route, latencies in sorted(by_route.items())
+        },
+        "cache_hit_ratio": hit_ratio(caches),
+        "recorded_cache_hit_ratio": hit_ratio(recorded),
+        "schedule_lag": summarize(lags),
+    }
+
+
+def hit_ratio(counts):
+    lookups = counts["hit"] + counts["miss"]
+    return round(counts["hit"] / lookups, 3) if lookups else None
+
+
+def print_report(result):
+    print(f"{result['requests']} requests in {result['seconds']}s "
+          f"({result['rps']} req/s)")
+    for route, stats in result["routes"].items():
+        print(f"  {route:<22} n={stats['count']:<7} p50 {stats['p50_ms']} ms   "
+              f"p95 {stats['p95_ms']} ms   p99 {stats['p99_ms']} ms   "
+              f"{stats['statuses']}")
+    print(f"  cache hit ratio        {result['cache_hit_ratio']} "
+          f"(recorded: {result['recorded_cache_hit_ratio']})")
+    lag = result["schedule_lag"]
+    print(f"  behind schedule        p50 {lag['p50_ms']} ms   p99 {lag['p99_ms']} ms")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Replay requests.jsonl traffic against a running server.")
+    parser.add_argument("logs", nargs="+",
+                        help="access logs, e.g. requests.jsonl requests.jsonl.1")
+    parser.add_argument("--url", default="http://127.0.0.1:5005")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="time compression; 0 replays as fast as possible")
+    parser.add_argument("--concurrency", type=int, default=32,
+                        help="most requests in flight (default 32)")
+    parser.add_argument("--limit", type=int, help="replay only the first N")
+    parser.add_argument("--saves", action="store_true",
+                        help="also replay saves; overwrites interpretations")
+    parser.add_argument("--json", help="also write the report to this file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    options = parse_args()
+    records = read_records(options.logs, options.saves, options.limit)
+    if not records:
+        sys.exit("No replayable records found.")
+
+    replayer = Replayer(options.url, options.concurrency)
+    elapsed = replayer.replay(records, options.speed)
+    result = report(records, replayer.results, elapsed)
+    print_report(result)
+
+    if options.json:
+        with open(options.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=4)
@@ -0,0 +1,143 @@
+"""
+GUI cold-start benchmark for BibleAppIP.py.
+
+    python bench/startup.py --runs 5 --budget-ms 300
+
+Starts a fresh interpreter per run and measures, from its first line:
+
+  import_ms   importing BibleAppIP
+  window_ms   until BibleApp's window has painted
+  loaded_ms   until the interpretation index is populated
+
+It also checks that importing BibleAppIP loads none of the libraries
+deferred to first use (requests, json, sqlite3, ...). Exits non-zero
+if the median window_ms exceeds --budget-ms or a deferred library was
+loaded early. Without a display, only the import is measured.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must not be imported before the window is up.
+DEFERRED = ("requests", "urllib3", "charset_normalizer", "json", "sqlite3",
+            "esv_client", "interpretation_store", "bible_lookup")
+
+
+# -----------------------------
+#  ONE RUN (child process)
+# -----------------------------
+def measure():
+    started = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    # Not even json is imported in this process before BibleAppIP, so
+    # the result is written by encode() below.
+    before = set(sys.modules)
+
+    import tkinter as tk
+    import BibleAppIP
+
+    result = {"import_ms": (time.perf_counter() - started) * 1000}
+    # Checked here: once the app is up, its worker threads import
+    # these on purpose.
+    result["early"] = sorted(m for m in DEFERRED
+                             if m in sys.modules and m not in before)
+
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return result
+
+    app = BibleAppIP.BibleApp(root)
+    root.update()
+    result["window_ms"] = (time.perf_counter() - started) * 1000
+
+    deadline = time.monotonic() + 30
+    while app.store is None and time.monotonic() < deadline:
+        root.update()
+        time.sleep(0.001)
+    result["loaded_ms"] = (time.perf_counter() - started) * 1000
+
+    app.close()
+    return result
+
+
+def encode(result):
+    parts = []
+    for key, value in result.items():
+        if isinstance(value, list):
+            value = "[" + ",".join(f'"{item}"' for item in value) + "]"
+        parts.append(f'"{key}":{value}')
+    return "{" + ",".join(parts) + "}"
+
+
+# -----------------------------
+#  DRIVER
+# -----------------------------
+def run_once():
+    import json
+
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(options):
+    import json
+
+    runs = [run_once() for _ in range(options.runs)]
+
+    report = {"runs": options.runs}
+    for key in ("import_ms", "window_ms", "loaded_ms"):
+        values = [run[key] for run in runs if key in run]
+        if values:
+            report[key] = {"median": round(statistics.median(values), 1),
+                           "max": round(max(values), 1)}
+    report["early_imports"] = sorted({m for run in runs for m in run["early"]})
+
+    for key in ("import_ms", "window_ms", "loaded_ms"):
+        if key in report:
+            print(f"  {key:<10} median {report[key]['median']} ms   "
+                  f"max {report[key]['max']} ms")
+    if "window_ms" not in report:
+        print("  (no display: import time only)")
+    if report["early_imports"]:
+        print(f"  imported at startup: {', '.join(report['early_imports'])}")
+
+    if options.json:
+        with open(options.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+
+    failures = []
+    measured = report.get("window_ms", report["import_ms"])
+    if options.budget_ms is not None and measured["median"] > options.budget_ms:
+        failures.append(f"startup {measured['median']} ms > {options.budget_ms} ms")
+    if report["early_imports"]:
+        failures.append("deferred modules imported at startup")
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="GUI cold-start benchmark.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=300,
+                        help="median time to first paint (default 300)")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    options = parse_args()
+    if options.child:
+        print(encode(measure()))
+    else:
+        failures = main(options)
+        if failures:
+            sys.exit("FAIL: " + "; ".join(failures))
@@ -1,20 +1,13 @@
-import requests
+import esv_client
+from esv_client import ESV_API_KEY
 
-ESV_API_KEY = "7580d95a1be11f5097f01d04f98f6d6d999d2768"
-
-headers = {
-    "Authorization": f"Token {ESV_API_KEY}"
-}
+headers = esv_client.HEADERS
 
 
 def lookup_verse(reference: str) -> str:
     reference = reference.strip()
 
-    # Your existing API call logic here
-    url = f"https://api.esv.org/v3/passage/text/?q={reference}"
-
-    response = requests.get(url, headers=headers)
-    data = response.json()
+    data = esv_client.get({"q": reference})
 
     return data["passages"][0]
 
@@ -29,12 +22,8 @@ def fetch_bible_verse(reference):
         "include-short-copyright": False,
     }
 
-    url = "https://api.esv.org/v3/passage/text/"
-
     try:
-        resp = requests.get(url, headers=headers, params=params, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
+        data = esv_client.get(params)
     except Exception as e:
         return None, f"ESV API error: {e}"
 
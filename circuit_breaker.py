@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+# -----------------------------
+#  CIRCUIT BREAKER
+# -----------------------------
+class CircuitBreaker:
+    """
+    Trips when the recent error rate (slow calls count as errors) goes
+    over failure_rate, measured over the last `window` calls once at
+    least min_calls have been seen.
+
+    While open, allow() is False and callers fail fast. After
+    reset_timeout one probe call is let through (half-open): success
+    closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_rate=0.5, window=20, min_calls=5,
+                 slow_call=5.0, reset_timeout=30.0):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.slow_call = slow_call
+        self.reset_timeout = reset_timeout
+        self._calls = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self.trips = 0
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and self._reset_due():
+                return HALF_OPEN
+            return self._state
+
+    def _reset_due(self):
+        return time.monotonic() - self._opened_at >= self.reset_timeout
+
+    def allow(self):
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and self._reset_due():
+                self._state = HALF_OPEN
+                self._probing = False
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, success, latency=0.0):
+        failed = not success or latency >= self.slow_call
+
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = False
+                if failed:
+                    self._trip()
+                else:
+                    self._state = CLOSED
+                    self._calls.clear()
+                return
+
+            self._calls.append(failed)
+            if (self._state == CLOSED and len(self._calls) >= self.min_calls
+                    and sum(self._calls) / len(self._calls) >= self.failure_rate):
+                self._trip()
+
+    def _trip(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._calls.clear()
+        self.trips += 1
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn through the breaker; raises CircuitOpenError if open."""
+        if not self.allow():
+            raise CircuitOpenError("ESV API unavailable (circuit open)")
+
+        started = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record(False, time.monotonic() - started)
+            raise
+        self.record(True, time.monotonic() - started)
+        return result
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
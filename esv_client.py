@@ -0,0 +1,196 @@
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from quota import INTERACTIVE, QuotaScheduler
+
+# -----------------------------
+#  ESV API CLIENT
+# -----------------------------
+ESV_API_KEY = os.environ.get(
+    "ESV_API_KEY", "7580d95a1be11f5097f01d04f98f6d6d999d2768")
+ESV_API_URL = os.environ.get(
+    "ESV_API_URL", "https://api.esv.org/v3/passage/text/")
+
+HEADERS = {"Authorization": f"Token {ESV_API_KEY}"}
+
+POOL_SIZE = int(os.environ.get("ESV_POOL_SIZE", 10))
+ASYNC_POOL_SIZE = int(os.environ.get("ESV_ASYNC_POOL_SIZE", 100))
+CONNECT_TIMEOUT = float(os.environ.get("ESV_CONNECT_TIMEOUT", 3.05))
+READ_TIMEOUT = float(os.environ.get("ESV_READ_TIMEOUT", 10))
+
+# Shared by every ESV call in this process. Trips on error rate or slow
+# calls so lookups fail fast (and fall back to stale cache) in an outage.
+breaker = CircuitBreaker(
+    failure_rate=float(os.environ.get("ESV_BREAKER_FAILURE_RATE", 0.5)),
+    window=int(os.environ.get("ESV_BREAKER_WINDOW", 20)),
+    min_calls=int(os.environ.get("ESV_BREAKER_MIN_CALLS", 5)),
+    slow_call=float(os.environ.get("ESV_BREAKER_SLOW_CALL", 5)),
+    reset_timeout=float(os.environ.get("ESV_BREAKER_RESET", 30)),
+)
+
+# ESV's published limits, split evenly between the gunicorn workers
+# (WEB_CONCURRENCY) because each worker keeps its own buckets.
+_workers = max(1, int(os.environ.get("WEB_CONCURRENCY", 1)))
+quota = QuotaScheduler(
+    [
+        (int(os.environ.get("ESV_QUOTA_PER_MINUTE", 60)) / _workers, 60),
+        (int(os.environ.get("ESV_QUOTA_PER_HOUR", 1000)) / _workers, 60 * 60),
+        (int(os.environ.get("ESV_QUOTA_PER_DAY", 5000)) / _workers, 24 * 60 * 60),
+    ],
+    background_reserve=float(os.environ.get("ESV_QUOTA_RESERVE", 0.25)),
+)
+# Quota the warm-up process spent before the workers started
+# (gunicorn.conf.py passes it on), shared out between the workers.
+if os.environ.get("ESV_QUOTA_SPENT"):
+    quota.charge({float(period): used / _workers for period, used
+                  in json.loads(os.environ["ESV_QUOTA_SPENT"]).items()})
+
+# How long a background call may wait for quota before giving up.
+BACKGROUND_WAIT = float(os.environ.get("ESV_BACKGROUND_WAIT", 30))
+
+UPSTREAM_SECONDS = metrics.histogram(
+    "bible_esv_request_duration_seconds",
+    "Time spent in ESV API calls that were sent.")
+UPSTREAM_ERRORS = metrics.counter(
+    "bible_esv_errors_total",
+    "ESV calls that failed, including ones refused by the breaker or quota.",
+    ["error"])
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+_async_clients = {}
+
+
+def get_session():
+    """
+    Return this worker's pooled keep-alive session.
+
+    The session is created lazily and rebuilt after a fork, so gunicorn
+    workers never share sockets inherited from the master.
+    """
+    global _session, _session_pid
+
+    if _session is not None and _session_pid == os.getpid():
+        return _session
+
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=POOL_SIZE,
+                pool_block=False,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(HEADERS)
+            _session = session
+            _session_pid = os.getpid()
+
+    return _session
+
+
+def get(params, timeout=None, priority=INTERACTIVE):
+    """
+    GET the ESV passage endpoint and return the decoded JSON.
+    Raises QuotaExceeded if the call doesn't fit the quota for its
+    priority (background calls wait for quota instead).
+    """
+    if timeout is None:
+        timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+    def request():
+        with UPSTREAM_SECONDS.time():
+            resp = get_session().get(ESV_API_URL, params=params, timeout=timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+    try:
+        quota.acquire(priority, timeout=BACKGROUND_WAIT)
+        try:
+            return breaker.call(request)
+        except CircuitOpenError:
+            # Never sent: an outage must not drain the daily budget.
+            quota.refund(priority)
+            raise
+    except Exception as e:
+        UPSTREAM_ERRORS.inc(error=type(e).__name__)
+        raise
+
+
+# -----------------------------
+#  ASYNC CLIENT
+# -----------------------------
+def get_async_client():
+    """
+    Pooled httpx.AsyncClient for the running event loop. httpx is only
+    imported here, so the sync server and the GUI never load it.
+    """
+    import asyncio
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            headers=HEADERS,
+            limits=httpx.Limits(
+                max_connections=ASYNC_POOL_SIZE,
+                max_keepalive_connections=ASYNC_POOL_SIZE,
+            ),
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def aget(params, priority=INTERACTIVE):
+    """Async form of get(): await the decoded JSON."""
+    import asyncio
+
+    # Send booleans the way requests does, so both clients hit the
+    # same upstream URLs.
+    params = {k: str(v) if isinstance(v, bool) else v
+              for k, v in params.items()}
+    try:
+        if priority == INTERACTIVE:
+            quota.acquire(INTERACTIVE)  # never blocks
+        else:
+            # Background calls may wait for quota; not on the loop.
+            await asyncio.to_thread(quota.acquire, priority, BACKGROUND_WAIT)
+        if not breaker.allow():
+            quota.refund(priority)
+            raise CircuitOpenError("ESV API unavailable (circuit open)")
+    except Exception as e:
+        UPSTREAM_ERRORS.inc(error=type(e).__name__)
+        raise
+
+    started = time.monotonic()
+    try:
+        resp = await get_async_client().get(ESV_API_URL, params=params)
+        UPSTREAM_SECONDS.observe(time.monotonic() - started)
+        resp.raise_for_status()
+        data = resp.json()
+    except Exception as e:
+        breaker.record(False, time.monotonic() - started)
+        UPSTREAM_ERRORS.inc(error=type(e).__name__)
+        raise
+    breaker.record(True, time.monotonic() - started)
+    return data
+
+
+async def aclose():
+    import asyncio
+
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
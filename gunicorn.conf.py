@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+# -----------------------------
+#  METRICS
+# -----------------------------
+# Workers share their /metrics totals through files in this directory.
+os.environ.setdefault(
+    "METRICS_DIR", os.path.join(tempfile.gettempdir(), "bible-metrics"))
+
+
+# -----------------------------
+#  UPSTREAM BATCHING
+# -----------------------------
+# Batching concurrent misses (server.py) only pays off when a worker
+# serves several requests at once; sync workers keep it off.
+def batching_enabled(cfg):
+    return cfg.threads > 1 or cfg.worker_class_str not in ("sync", "gthread")
+
+
+# -----------------------------
+#  CACHE WARM-UP
+# -----------------------------
+# Runs once before any worker forks, so the shared SQLite passage cache
+# is warm before the first request. It runs in a child process: importing
+# server here would load the app into the master (in effect --preload),
+# and HUP would no longer pick up new code. Set WARMUP=0 to skip.
+WARMUP_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "warmup.py")
+
+# The socket is not bound until warm-up returns, so cap it well inside
+# the platform's boot limit (60 s on Heroku). Whatever was fetched by
+# then is already in the shared cache.
+WARMUP_TIMEOUT = float(os.environ.get("WARMUP_TIMEOUT", 45))
+
+
+def on_starting(server):
+    import metrics
+
+    # Totals from a previous run would be counted again.
+    metrics.clear_directory(os.environ["METRICS_DIR"])
+
+    # Workers inherit the master's environment.
+    if batching_enabled(server.cfg):
+        os.environ.setdefault("ESV_BATCH_WINDOW_MS", "5")
+
+    if os.environ.get("WARMUP", "1") == "0":
+        return
+
+    # The child keeps one set of buckets for the whole ESV budget
+    # (WEB_CONCURRENCY=1) and writes what it spent to quota_file. Workers
+    # inherit that as ESV_QUOTA_SPENT and each take their share.
+    quota_file = os.path.join(
+        tempfile.gettempdir(), f"bible-warmup-quota-{os.getpid()}.json")
+    env = dict(os.environ, WEB_CONCURRENCY="1", WARMUP_QUOTA_FILE=quota_file)
+    try:
+        result = subprocess.run([sys.executable, WARMUP_SCRIPT],
+                                env=env, timeout=WARMUP_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        server.log.warning("Cache warm-up stopped after %ss (WARMUP_TIMEOUT)",
+                           WARMUP_TIMEOUT)
+    except OSError as e:
+        server.log.warning("Cache warm-up failed: %s", e)
+    else:
+        if result.returncode != 0:
+            server.log.warning("Cache warm-up failed (exit status %s)",
+                               result.returncode)
+    finally:
+        try:
+            with open(quota_file, "r", encoding="utf-8") as f:
+                os.environ["ESV_QUOTA_SPENT"] = f.read()
+            os.remove(quota_file)
+        except OSError:
+            pass
@@ -0,0 +1,587 @@
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+import metrics
+from references import normalize
+from search_index import MIN_PREFIX, InvertedIndex, tokenize
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process GUI, no locking needed
+    fcntl = None
+
+
+STORE_SECONDS = metrics.histogram(
+    "bible_interpretation_store_seconds",
+    "Interpretation store loads, saves and compactions.",
+    ["backend", "operation"])
+
+
+def _search_text(reference, entry):
+    return f"{reference} {entry.get('interpretation', '')}"
+
+
+# -----------------------------
+#  JSON STORE
+# -----------------------------
+class JSONInterpretationStore:
+    """
+    In-memory view of interpretations.json, keyed by canonical reference.
+
+    The file is parsed once at startup. Reads only stat() the file
+    (at most every check_interval seconds) and reparse it when its
+    mtime or size changed, e.g. after another worker saved.
+
+    Saves append one JSON line to "<path>.journal" instead of rewriting
+    the whole file. A background thread folds the journal into a new
+    snapshot once it passes compact_bytes; other processes pick up
+    journal appends by reading only the new tail.
+    """
+
+    def __init__(self, path, check_interval=1.0, compact_bytes=256 * 1024,
+                 compact_interval=30.0):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.check_interval = check_interval
+        self.compact_bytes = compact_bytes
+        self.compact_interval = compact_interval
+        self._lock = threading.RLock()
+        self._data = {}
+        self._signature = None
+        self._journal_offset = 0
+        self._journal_fd = None
+        self._journal_pid = None
+        self._compactor = None
+        self._index = InvertedIndex()
+        self._checked = 0.0
+        self.error = None
+        self.version = 0
+        self.reloads = 0
+        self.compactions = 0
+        self._reload()
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _journal_size(self):
+        try:
+            return os.path.getsize(self.journal_path)
+        except OSError:
+            return 0
+
+    def _reload(self):
+        with STORE_SECONDS.time(backend="json", operation="load"):
+            self._load()
+
+    def _load(self):
+        signature = self._stat_signature()
+        self.error = None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            raw = {}
+        except (OSError, ValueError) as e:
+            self.error = e
+            raw = {}
+
+        self._data = {normalize(ref): entry for ref, entry in raw.items()}
+        self._index.clear()
+        for reference, entry in self._data.items():
+            self._index.add(reference, _search_text(reference, entry))
+        self._signature = signature
+        self._journal_offset = 0
+        self._replay_journal()
+        self.version += 1
+        self.reloads += 1
+
+    def _replay_journal(self):
+        """Apply journal records written since _journal_offset."""
+        try:
+            with open(self.journal_path, "rb") as f:
+                f.seek(self._journal_offset)
+                chunk = f.read()
+        except OSError:
+            return False
+
+        # Stop at the last complete line; a partial one is still being written.
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            self._apply(record)
+
+        self._journal_offset += end
+        return end > 0
+
+    def _apply(self, record):
+        reference = record.get("reference")
+        if record.get("op") == "delete":
+            self._data.pop(reference, None)
+            self._index.remove(reference)
+        elif reference is not None:
+            entry = record.get("entry", {})
+            self._data[reference] = entry
+            self._index.add(reference, _search_text(reference, entry))
+
+    def refresh(self):
+        """Pick up changes made by other processes since we last looked."""
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        with self._lock:
+            self._checked = now
+            if self._stat_signature() != self._signature:
+                self._reload()
+                return
+
+            journal_size = self._journal_size()
+            if journal_size < self._journal_offset:
+                # Compacted by another process.
+                self._reload()
+            elif journal_size > self._journal_offset:
+                if self._replay_journal():
+                    self.version += 1
+
+    # -----------------------------
+    #  READS
+    # -----------------------------
+    def get(self, reference):
+        self.refresh()
+        return self._data.get(normalize(reference))
+
+    def get_interpretation(self, reference):
+        entry = self.get(reference) or {}
+        return entry.get("interpretation", "")
+
+    def all(self):
+        self.refresh()
+        return dict(self._data)
+
+    def __contains__(self, reference):
+        return self.get(reference) is not None
+
+    def __len__(self):
+        self.refresh()
+        return len(self._data)
+
+    def search(self, query, limit=20):
+        """Ranked full-text search: [(reference, entry, score)]."""
+        self.refresh()
+        return [(ref, self._data[ref], score)
+                for ref, score in self._index.search(query, limit)]
+
+    # -----------------------------
+    #  WRITES
+    # -----------------------------
+    def set(self, reference, interpretation):
+        reference = normalize(reference)
+        entry = {"verse": reference, "interpretation": interpretation}
+        self._append({"op": "set", "reference": reference, "entry": entry})
+
+    def delete(self, reference):
+        reference = normalize(reference)
+        with self._lock:
+            self._checked = 0.0
+            self.refresh()
+            if reference not in self._data:
+                return False
+            self._append({"op": "delete", "reference": reference})
+            return True
+
+    def _journal(self):
+        # One O_APPEND descriptor per process, reopened after a fork.
+        if self._journal_fd is None or self._journal_pid != os.getpid():
+            self._journal_fd = os.open(
+                self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self._journal_pid = os.getpid()
+        return self._journal_fd
+
+    def _append(self, record):
+        line = (json.dumps(record) + "\n").encode("utf-8")
+
+        with self._lock, STORE_SECONDS.time(backend="json", operation="save"):
+            fd = self._journal()
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_SH)
+            try:
+                # Catch up first so our own line is the next one we replay.
+                self._checked = 0.0
+                self.refresh()
+                os.write(fd, line)
+                self._replay_journal()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+
+            self.version += 1
+
+        self._start_compactor()
+
+    # -----------------------------
+    #  COMPACTION
+    # -----------------------------
+    def _start_compactor(self):
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(
+            target=self._compact_loop, name="interpretations-compactor",
+            daemon=True)
+        self._compactor.start()
+
+    def _compact_loop(self):
+        while True:
+            time.sleep(self.compact_interval)
+            if self._journal_size() >= self.compact_bytes:
+                try:
+                    self.compact()
+                except OSError:
+                    pass
+
+    def compact(self):
+        """Fold the journal into a fresh snapshot and truncate it."""
+        with self._lock, STORE_SECONDS.time(backend="json", operation="compact"):
+            fd = self._journal()
+            if fcntl is not None:
+                # Exclusive: no other process may append mid-compaction.
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                self._reload()
+                if self.error is not None:
+                    # Never replace a snapshot we could not read.
+                    return
+                self._write_snapshot()
+                os.ftruncate(fd, 0)
+                self._journal_offset = 0
+                self.compactions += 1
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def _write_snapshot(self):
+        # Write to a temp file and rename, so readers never see half a file.
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, indent=4)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, self.path)
+
+        self._signature = self._stat_signature()
+
+
+# -----------------------------
+#  SQLITE STORE
+# -----------------------------
+class SQLiteInterpretationStore:
+    """
+    Interpretations in SQLite, indexed by canonical reference.
+
+    WAL mode lets every gunicorn worker read while one writes, and each
+    save is a single transactional upsert, so concurrent
+    /save_interpretation calls no longer overwrite each other's edits.
+    A meta row counts writes; it serves as a cross-process version.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.error = None
+        self._local = threading.local()
+        self._init_schema()
+
+    def _connect(self):
+        # One connection per thread, reopened after a fork.
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS interpretations (
+                reference      TEXT PRIMARY KEY,
+                verse          TEXT NOT NULL,
+                interpretation TEXT NOT NULL,
+                updated        REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self._init_fts(conn)
+        conn.execute(
+            "INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0)")
+
+    def _init_fts(self, conn):
+        # FTS5 index kept current by triggers, so every save updates it
+        # incrementally. Falls back to LIKE if SQLite lacks FTS5.
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'interpretations_fts'"
+        ).fetchone()
+        try:
+            conn.execute(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS interpretations_fts USING fts5(
+                    reference, interpretation,
+                    content='interpretations', content_rowid='rowid',
+                    tokenize='unicode61'
+                )
+                """
+            )
+        except sqlite3.OperationalError:
+            self.fts = False
+            return
+
+        self.fts = True
+        conn.executescript(
+            """
+            CREATE TRIGGER IF NOT EXISTS interpretations_ai
+            AFTER INSERT ON interpretations BEGIN
+                INSERT INTO interpretations_fts (rowid, reference, interpretation)
+                VALUES (new.rowid, new.reference, new.interpretation);
+            END;
+            CREATE TRIGGER IF NOT EXISTS interpretations_ad
+            AFTER DELETE ON interpretations BEGIN
+                INSERT INTO interpretations_fts
+                    (interpretations_fts, rowid, reference, interpretation)
+                VALUES ('delete', old.rowid, old.reference, old.interpretation);
+            END;
+            CREATE TRIGGER IF NOT EXISTS interpretations_au
+            AFTER UPDATE ON interpretations BEGIN
+                INSERT INTO interpretations_fts
+                    (interpretations_fts, rowid, reference, interpretation)
+                VALUES ('delete', old.rowid, old.reference, old.interpretation);
+                INSERT INTO interpretations_fts (rowid, reference, interpretation)
+                VALUES (new.rowid, new.reference, new.interpretation);
+            END;
+            """
+        )
+        if not exists:
+            # Index rows written before the FTS table existed.
+            conn.execute(
+                "INSERT INTO interpretations_fts (interpretations_fts) VALUES ('rebuild')")
+
+    @property
+    def version(self):
+        row = self._connect().execute(
+            "SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0] if row else 0
+
+    def refresh(self):
+        # Every read goes to the database; nothing to reload.
+        pass
+
+    # -----------------------------
+    #  READS
+    # -----------------------------
+    def get(self, reference):
+        with STORE_SECONDS.time(backend="sqlite", operation="load"):
+            row = self._connect().execute(
+                "SELECT verse, interpretation FROM interpretations WHERE reference = ?",
+                (normalize(reference),),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"verse": row[0], "interpretation": row[1]}
+
+    def get_interpretation(self, reference):
+        entry = self.get(reference) or {}
+        return entry.get("interpretation", "")
+
+    def all(self):
+        rows = self._connect().execute(
+            "SELECT reference, verse, interpretation FROM interpretations")
+        return {ref: {"verse": verse, "interpretation": text}
+                for ref, verse, text in rows}
+
+    def page(self, offset=0, limit=50):
+        """Entries in reference order, without loading the whole table."""
+        rows = self._connect().execute(
+            "SELECT reference, verse, interpretation FROM interpretations "
+            "ORDER BY reference LIMIT ? OFFSET ?",
+            (limit, offset),
+        )
+        return [(ref, {"verse": verse, "interpretation": text})
+                for ref, verse, text in rows]
+
+    def __contains__(self, reference):
+        return self.get(reference) is not None
+
+    def __len__(self):
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM interpretations").fetchone()[0]
+
+    def search(self, query, limit=20):
+        """Ranked full-text search: [(reference, entry, score)]."""
+        words = tokenize(query)
+        if not words:
+            return []
+
+        if self.fts:
+            # Every word must match, each as a prefix ("forgiv*").
+            match = " AND ".join(
+                f'"{word}"*' if len(word) >= MIN_PREFIX else f'"{word}"'
+                for word in words)
+            rows = self._connect().execute(
+                "SELECT i.reference, i.verse, i.interpretation, -f.rank "
+                "FROM interpretations_fts f "
+                "JOIN interpretations i ON i.rowid = f.rowid "
+                "WHERE interpretations_fts MATCH ? "
+                "ORDER BY f.rank LIMIT ?",
+                (match, limit),
+            )
+        else:
+            where = " AND ".join(
+                "(reference || ' ' || interpretation) LIKE ?" for _ in words)
+            rows = self._connect().execute(
+                "SELECT reference, verse, interpretation, 0 FROM interpretations "
+                f"WHERE {where} ORDER BY reference LIMIT ?",
+                [f"%{word}%" for word in words] + [limit],
+            )
+
+        return [(ref, {"verse": verse, "interpretation": text}, score)
+                for ref, verse, text, score in rows]
+
+    # -----------------------------
+    #  WRITES
+    # -----------------------------
+    def _write(self, statements):
+        with STORE_SECONDS.time(backend="sqlite", operation="save"):
+            return self._transaction(statements)
+
+    def _transaction(self, statements):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            changed = 0
+            for sql, args in statements:
+                changed += conn.execute(sql, args).rowcount
+            if changed:
+                conn.execute(
+                    "UPDATE meta SET value = value + 1 WHERE key = 'version'")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return changed
+
+    def _upsert(self, reference, entry):
+        return (
+            "INSERT INTO interpretations (reference, verse, interpretation, updated) "
+            "VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (reference) DO UPDATE SET "
+            "verse = excluded.verse, "
+            "interpretation = excluded.interpretation, "
+            "updated = excluded.updated",
+            (reference, entry.get("verse", reference),
+             entry.get("interpretation", ""), time.time()),
+        )
+
+    def set(self, reference, interpretation):
+        reference = normalize(reference)
+        entry = {"verse": reference, "interpretation": interpretation}
+        self._write([self._upsert(reference, entry)])
+
+    def delete(self, reference):
+        return self._write([(
+            "DELETE FROM interpretations WHERE reference = ?",
+            (normalize(reference),),
+        )]) > 0
+
+    # -----------------------------
+    #  JSON IMPORT / EXPORT
+    # -----------------------------
+    def import_json(self, path):
+        """Upsert every entry of an interpretations.json file."""
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        self._write([self._upsert(normalize(ref), entry)
+                     for ref, entry in raw.items()])
+        return len(raw)
+
+    def seed(self, json_path):
+        """
+        Import json_path into a database that has never been seeded.
+        A 'seeded' meta row records that it happened (or that the
+        database already had data), so deleting every interpretation
+        later does not bring the old file back.
+        """
+        conn = self._connect()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'seeded'").fetchone():
+            return False
+
+        if len(self) == 0 and os.path.exists(json_path):
+            self.import_json(json_path)
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('seeded', 1)")
+        return True
+
+    def export_json(self, path):
+        data = self.all()
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+        return len(data)
+
+
+# -----------------------------
+#  FACTORY
+# -----------------------------
+def open_interpretation_store(json_path, backend=None, db_path=None):
+    """
+    Open the configured store. backend is "sqlite" (default) or "json",
+    overridable with INTERPRETATION_STORE. A new SQLite database is
+    seeded once from json_path, which otherwise stays an import/export
+    format.
+    """
+    if backend is None:
+        backend = os.environ.get("INTERPRETATION_STORE", "sqlite")
+
+    if backend == "json":
+        return JSONInterpretationStore(json_path)
+
+    if db_path is None:
+        db_path = os.environ.get(
+            "INTERPRETATIONS_DB", os.path.splitext(json_path)[0] + ".sqlite3")
+
+    store = SQLiteInterpretationStore(db_path)
+    try:
+        store.seed(json_path)
+    except (OSError, ValueError) as e:
+        store.error = e
+    return store
+
+
+if __name__ == "__main__":
+    # python interpretation_store.py import|export interpretations.json
+    if len(sys.argv) != 3 or sys.argv[1] not in ("import", "export"):
+        sys.exit("usage: interpretation_store.py import|export FILE.json")
+
+    command, json_file = sys.argv[1], sys.argv[2]
+    db = SQLiteInterpretationStore(
+        os.environ.get("INTERPRETATIONS_DB", "interpretations.sqlite3"))
+    if command == "import":
+        print(f"Imported {db.import_json(json_file)} interpretations.")
+    else:
+        print(f"Exported {db.export_json(json_file)} interpretations.")
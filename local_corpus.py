@@ -0,0 +1,215 @@
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+from references import BOOK_NAMES, parse, resolve_book, verse_id
+
+# -----------------------------
+#  FILE FORMAT
+# -----------------------------
+# header:  magic (8 bytes), verse count N (uint32)
+# ids:     N x uint32 verse ids (BBCCCVVV), ascending
+# offsets: N + 1 x uint32 byte offsets into the text blob
+# blob:    UTF-8 verse texts, back to back
+#
+# Everything is little-endian. The ids and offsets are read straight out
+# of the memory map, so opening a corpus costs no parsing at all.
+MAGIC = b"BIBLCRP1"
+HEADER = struct.Struct("<8sI")
+
+
+# -----------------------------
+#  IMPORTER
+# -----------------------------
+_TEXT_LINE = re.compile(r"^\s*(.+?)\s+(\d+):(\d+)\s+(.*\S)\s*$")
+
+
+def _verse_record(book, chapter, verse, text):
+    name = resolve_book(str(book))
+    if name is None and str(book).isdigit() and 1 <= int(book) <= len(BOOK_NAMES):
+        name = BOOK_NAMES[int(book) - 1]
+    if name is None:
+        raise ValueError(f"Unknown book: {book!r}")
+    return verse_id(name, int(chapter), int(verse)), str(text).strip()
+
+
+def read_text(path):
+    """
+    Plain text, one verse per line: "Genesis 1:1 In the beginning..."
+    or tab separated: "Gen<TAB>1<TAB>1<TAB>In the beginning...".
+    """
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) == 4:
+                yield _verse_record(*fields)
+                continue
+            m = _TEXT_LINE.match(line)
+            if m:
+                yield _verse_record(*m.groups())
+
+
+def read_json(path):
+    """
+    Either a list of {"book", "chapter", "verse", "text"} objects or
+    nested {book: {chapter: {verse: text}}}.
+    """
+    with open(path, "r", encoding="utf-8-sig") as f:
+        data = json.load(f)
+
+    if isinstance(data, dict):
+        for book, chapters in data.items():
+            for chapter, verses in chapters.items():
+                for verse, text in verses.items():
+                    yield _verse_record(book, chapter, verse, text)
+        return
+
+    for row in data:
+        book = row.get("book", row.get("book_name"))
+        yield _verse_record(book, row["chapter"], row["verse"], row["text"])
+
+
+def build_corpus(records, out_path):
+    """Write (verse_id, text) records as a corpus file. Returns the count."""
+    verses = dict(records)
+    ids = array("I", sorted(verses))
+    offsets = array("I", [0])
+    blob = bytearray()
+    for vid in ids:
+        blob += verses[vid].encode("utf-8")
+        offsets.append(len(blob))
+
+    if sys.byteorder != "little":
+        ids.byteswap()
+        offsets.byteswap()
+
+    tmp = out_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(ids)))
+        f.write(ids.tobytes())
+        f.write(offsets.tobytes())
+        f.write(blob)
+    os.replace(tmp, out_path)
+    return len(ids)
+
+
+def import_corpus(source_path, out_path):
+    if source_path.endswith(".json"):
+        records = read_json(source_path)
+    else:
+        records = read_text(source_path)
+    return build_corpus(records, out_path)
+
+
+# -----------------------------
+#  MEMORY-MAPPED CORPUS
+# -----------------------------
+class LocalCorpus:
+    """
+    Read-only verse store backed by a memory-mapped corpus file.
+
+    Lookups bisect the id array for the first and last verse of each
+    segment and slice the text blob; pages are loaded by the OS on
+    demand and shared between every worker that maps the same file.
+    """
+
+    def __init__(self, path, name="Local"):
+        self.path = path
+        self.name = name
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a corpus file")
+
+        start = HEADER.size
+        ids_end = start + 4 * count
+        offsets_end = ids_end + 4 * (count + 1)
+        self._view = None
+        if sys.byteorder == "little":
+            self._view = memoryview(self._mm)
+            self._ids = self._view[start:ids_end].cast("I")
+            self._offsets = self._view[ids_end:offsets_end].cast("I")
+        else:
+            self._ids = array("I", self._mm[start:ids_end])
+            self._ids.byteswap()
+            self._offsets = array("I", self._mm[ids_end:offsets_end])
+            self._offsets.byteswap()
+        self._blob = offsets_end
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def _text(self, index):
+        start = self._blob + self._offsets[index]
+        end = self._blob + self._offsets[index + 1]
+        return self._mm[start:end].decode("utf-8")
+
+    def verse(self, book, chapter, verse):
+        vid = verse_id(book, chapter, verse)
+        i = bisect_left(self._ids, vid)
+        if i < self.count and self._ids[i] == vid:
+            return self._text(i)
+        return None
+
+    def verses(self, reference):
+        """[(verse_id, text)] for every verse a reference covers."""
+        found = []
+        for passage in parse(reference):
+            for seg in passage.segments:
+                first = verse_id(passage.book, seg.start_chapter,
+                                 seg.start_verse or 1)
+                last = verse_id(passage.book, seg.end_chapter,
+                                seg.end_verse or 999)
+                lo = bisect_left(self._ids, first)
+                hi = bisect_right(self._ids, last)
+                found.extend((self._ids[i], self._text(i)) for i in range(lo, hi))
+        return found
+
+    def passage_text(self, reference):
+        """
+        Verse text formatted like the ESV text endpoint ("[16] For God
+        ..."), or None if the corpus has none of the verses.
+        """
+        parts = []
+        chapter = None
+        for vid, text in self.verses(reference):
+            verse = vid % 1000
+            # Mark chapter changes inside a range as [4:1].
+            if chapter is not None and vid // 1000 != chapter:
+                parts.append(f"[{vid // 1000 % 1000}:{verse}] {text}")
+            else:
+                parts.append(f"[{verse}] {text}")
+            chapter = vid // 1000
+        if not parts:
+            return None
+        return " ".join(parts)
+
+    def close(self):
+        if self._view is not None:
+            self._ids.release()
+            self._offsets.release()
+            self._view.release()
+        self._mm.close()
+        self._file.close()
+
+
+if __name__ == "__main__":
+    # python local_corpus.py import kjv.json kjv.corpus
+    # python local_corpus.py lookup kjv.corpus "John 3:16-18"
+    if len(sys.argv) == 4 and sys.argv[1] == "import":
+        count = import_corpus(sys.argv[2], sys.argv[3])
+        print(f"Wrote {count} verses to {sys.argv[3]}")
+    elif len(sys.argv) == 4 and sys.argv[1] == "lookup":
+        print(LocalCorpus(sys.argv[2]).passage_text(sys.argv[3]))
+    else:
+        sys.exit("usage: local_corpus.py import SOURCE OUT | lookup CORPUS REF")
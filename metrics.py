@@ -0,0 +1,303 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# -----------------------------
+#  METRICS
+# -----------------------------
+class _Metric:
+    type = None
+
+    def __init__(self, registry, name, help, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def snapshot(self):
+        return {
+            "type": self.type,
+            "help": self.help,
+            "labelnames": list(self.labelnames),
+            "samples": [[list(key), list(value) if isinstance(value, list) else value]
+                        for key, value in self._values.items()],
+        }
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """A current value. Across processes, only live ones are summed."""
+
+    type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.registry._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, registry, name, help, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.registry._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # One count per bucket plus +Inf, then the sum.
+                counts = self._values[key] = [0] * (len(self.buckets) + 2)
+            counts[bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self):
+        snapshot = super().snapshot()
+        snapshot["buckets"] = list(self.buckets)
+        return snapshot
+
+
+# -----------------------------
+#  REGISTRY
+# -----------------------------
+class Registry:
+    """
+    Metrics of this process, optionally shared between processes.
+
+    Each gunicorn worker counts in memory. With a directory configured,
+    a background thread writes the worker's totals to <directory>/<pid>.json
+    every flush_interval seconds, and render() merges every worker's
+    file, so a scrape that lands on any worker sees the whole server.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self.directory = None
+        self.flush_interval = 1.0
+        self._flusher = None
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, *args, **kwargs)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter, name, help, labelnames)
+
+    def gauge(self, name, help, labelnames=()):
+        return self._register(Gauge, name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help, labelnames, buckets)
+
+    def add_collector(self, fn):
+        """fn() runs before every snapshot, e.g. to set gauges."""
+        self._collectors.append(fn)
+
+    # -----------------------------
+    #  MULTIPROCESS
+    # -----------------------------
+    def enable_multiprocess(self, directory, flush_interval=1.0):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.flush_interval = flush_interval
+        atexit.register(self.flush)
+        self._start_flusher()
+
+    def _start_flusher(self):
+        self._flusher = threading.Thread(
+            target=self._flush_loop, name="metrics-flush", daemon=True)
+        self._flusher.start()
+
+    def _after_fork(self):
+        # A forked worker starts from zero: the parent's totals are
+        # already in the parent's own file.
+        self._lock = threading.Lock()
+        for metric in self._metrics.values():
+            metric._values = {}
+        if self.directory is not None:
+            self._start_flusher()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def snapshot(self):
+        for collect in self._collectors:
+            try:
+                collect()
+            except Exception:
+                pass
+        with self._lock:
+            return {name: metric.snapshot()
+                    for name, metric in self._metrics.items()}
+
+    def flush(self):
+        """Write this process's totals to its file in the directory."""
+        if self.directory is None:
+            return
+        data = json.dumps({"pid": os.getpid(), "metrics": self.snapshot()})
+
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, os.path.join(self.directory, f"{os.getpid()}.json"))
+
+    def _read_all(self):
+        """Every process's snapshot, this one's fresh."""
+        self.flush()
+        snapshots = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), "r",
+                          encoding="utf-8") as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    # -----------------------------
+    #  EXPOSITION
+    # -----------------------------
+    def collect(self):
+        """Merged {name: snapshot} over every process."""
+        if self.directory is None:
+            return self.snapshot()
+
+        merged = {}
+        for snapshot in self._read_all():
+            alive = _pid_alive(snapshot.get("pid"))
+            for name, metric in snapshot.get("metrics", {}).items():
+                if metric["type"] == "gauge" and not alive:
+                    continue
+                target = merged.setdefault(name, dict(metric, samples={}))
+                samples = target["samples"]
+                for key, value in metric["samples"]:
+                    key = tuple(key)
+                    if key not in samples:
+                        samples[key] = value
+                    elif metric["type"] == "histogram":
+                        samples[key] = [a + b for a, b in zip(samples[key], value)]
+                    else:
+                        samples[key] += value
+
+        for metric in merged.values():
+            metric["samples"] = [[list(k), v] for k, v in metric["samples"].items()]
+        return merged
+
+    def render(self):
+        """Prometheus text exposition format."""
+        lines = []
+        for name, metric in sorted(self.collect().items()):
+            lines.append(f"# HELP {name} {_escape_help(metric['help'])}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            labelnames = metric["labelnames"]
+
+            for key, value in sorted(metric["samples"]):
+                labels = list(zip(labelnames, key))
+                if metric["type"] != "histogram":
+                    lines.append(f"{name}{_labels(labels)} {value}")
+                    continue
+
+                cumulative = 0
+                for bound, count in zip(metric["buckets"] + ["+Inf"], value):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels + [('le', bound)])} "
+                                 f"{cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {value[-1]}")
+                lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except PermissionError:
+        return True
+    except (OSError, TypeError):
+        return False
+    return True
+
+
+def _escape_help(text):
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    escaped = (f'{name}="' + str(value).replace("\\", "\\\\")
+               .replace('"', '\\"').replace("\n", "\\n") + '"'
+               for name, value in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+# The process-wide registry every module records into.
+registry = Registry()
+
+counter = registry.counter
+gauge = registry.gauge
+histogram = registry.histogram
+
+
+def clear_directory(directory):
+    """Drop every process file, e.g. when the server (re)starts."""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        if name.endswith((".json", ".tmp")):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
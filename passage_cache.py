@@ -0,0 +1,293 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+LOOKUPS = metrics.counter(
+    "bible_passage_cache_lookups_total",
+    "Passage cache lookups by result (hit, miss, stale) and tier.",
+    ["result", "tier"])
+EVICTIONS = metrics.counter(
+    "bible_passage_cache_evictions_total",
+    "Passages evicted from the in-memory LRU.")
+
+
+# -----------------------------
+#  PASSAGE CACHE
+# -----------------------------
+def make_key(reference, params):
+    """
+    Cache key for a passage: the reference plus the exact ESV parameter
+    set, so lookups with different formatting options never collide.
+    """
+    items = tuple(sorted((k, v) for k, v in params.items() if k != "q"))
+    return (reference, items)
+
+
+def key_to_str(key):
+    reference, items = key
+    return reference + "|" + json.dumps(items, separators=(",", ":"))
+
+
+class PassageCache:
+    """
+    Size-bounded LRU cache with a per-entry TTL.
+    Safe to share between the threads of one worker.
+
+    An optional backend (e.g. SQLitePassageCache) is consulted on a
+    memory miss and written through on every set.
+    """
+
+    def __init__(self, max_entries=1024, ttl=24 * 60 * 60, backend=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_hits = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    LOOKUPS.inc(result="hit", tier="memory")
+                    return value
+                # Expired entries stay until evicted; get_stale() may
+                # still serve them while upstream is down.
+
+        if self.backend is not None:
+            found = self.backend.get(key)
+            if found is not None:
+                value, remaining = found
+                self._store(key, value, remaining)
+                with self._lock:
+                    self.hits += 1
+                LOOKUPS.inc(result="hit", tier="sqlite")
+                return value
+
+        with self._lock:
+            self.misses += 1
+        LOOKUPS.inc(result="miss", tier="")
+        return None
+
+    def get_stale(self, key):
+        """The last known value for key, even if expired, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.stale_hits += 1
+                LOOKUPS.inc(result="stale", tier="memory")
+                return entry[0]
+
+        if self.backend is not None:
+            found = self.backend.get(key, include_expired=True)
+            if found is not None:
+                with self._lock:
+                    self.stale_hits += 1
+                LOOKUPS.inc(result="stale", tier="sqlite")
+                return found[0]
+        return None
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+        self._store(key, value, ttl)
+        if self.backend is not None:
+            self.backend.set(key, value, ttl)
+
+    def _store(self, key, value, ttl):
+        expires = time.monotonic() + ttl
+
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+                EVICTIONS.inc()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "stale_hits": self.stale_hits,
+            }
+
+
+# -----------------------------
+#  PERSISTENT (SQLITE) STORE
+# -----------------------------
+class SQLitePassageCache:
+    """
+    On-disk passage store shared by every gunicorn worker.
+
+    A single SQLite file in WAL mode, so readers never block each other
+    or the writer, and entries survive restarts and deploys. Expiry uses
+    wall-clock time because it is compared across processes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._init_schema()
+
+    def _connect(self):
+        # One connection per thread, reopened after a fork.
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS passages (
+                key       TEXT PRIMARY KEY,
+                reference TEXT NOT NULL,
+                text      TEXT NOT NULL,
+                expires   REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS passages_reference ON passages (reference)"
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS fill_locks (
+                key     TEXT PRIMARY KEY,
+                owner   INTEGER NOT NULL,
+                expires REAL NOT NULL
+            )
+            """
+        )
+
+    def get(self, key, include_expired=False):
+        """
+        Return (value, remaining_ttl) or None if missing or expired.
+        With include_expired, expired rows are returned too.
+        """
+        try:
+            row = self._connect().execute(
+                "SELECT text, expires FROM passages WHERE key = ?",
+                (key_to_str(key),),
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+
+        if row is None:
+            return None
+
+        text, expires = row
+        remaining = expires - time.time()
+        if remaining <= 0 and not include_expired:
+            return None
+        return text, remaining
+
+    def set(self, key, value, ttl):
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO passages (key, reference, text, expires) "
+                "VALUES (?, ?, ?, ?)",
+                (key_to_str(key), key[0], value, time.time() + ttl),
+            )
+        except sqlite3.Error:
+            # The shared store is best effort; memory still holds the entry.
+            pass
+
+    def purge_expired(self, grace=7 * 24 * 60 * 60):
+        """
+        Drop rows expired for longer than grace (until then they are
+        kept for stale serving). Returns the number of rows dropped.
+        """
+        try:
+            return self._connect().execute(
+                "DELETE FROM passages WHERE expires <= ?",
+                (time.time() - grace,)).rowcount
+        except sqlite3.Error:
+            return 0
+
+    # -----------------------------
+    #  CROSS-WORKER FILL LOCKS
+    # -----------------------------
+    def try_lock(self, key, ttl=15.0):
+        """
+        Claim the right to fetch key upstream. Returns False if another
+        worker holds an unexpired claim. Claims expire after ttl so a
+        crashed worker can't block a key forever.
+        """
+        conn = self._connect()
+        now = time.time()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "DELETE FROM fill_locks WHERE key = ? AND expires <= ?",
+                (key_to_str(key), now))
+            claimed = conn.execute(
+                "INSERT OR IGNORE INTO fill_locks (key, owner, expires) "
+                "VALUES (?, ?, ?)",
+                (key_to_str(key), os.getpid(), now + ttl)).rowcount
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            # If the store is unavailable, fetch rather than wait.
+            return True
+        return claimed == 1
+
+    def unlock(self, key):
+        try:
+            self._connect().execute(
+                "DELETE FROM fill_locks WHERE key = ? AND owner = ?",
+                (key_to_str(key), os.getpid()))
+        except sqlite3.Error:
+            pass
+
+    def wait_for(self, key, timeout=15.0, poll=0.02):
+        """Poll until another worker fills key; None on timeout."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            found = self.get(key)
+            if found is not None:
+                return found[0]
+            try:
+                held = self._connect().execute(
+                    "SELECT 1 FROM fill_locks WHERE key = ? AND expires > ?",
+                    (key_to_str(key), time.time())).fetchone()
+            except sqlite3.Error:
+                held = None
+            if held is None:
+                # The holder finished without a result (error or not found).
+                found = self.get(key)
+                return found[0] if found is not None else None
+            time.sleep(poll)
+        return None
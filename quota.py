@@ -0,0 +1,143 @@
+import threading
+import time
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+# -----------------------------
+#  TOKEN BUCKET
+# -----------------------------
+class TokenBucket:
+    """capacity tokens, refilled continuously over period seconds."""
+
+    def __init__(self, capacity, period):
+        self.capacity = float(capacity)
+        self.period = float(period)
+        self.rate = self.capacity / self.period
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now):
+        elapsed = now - self._updated
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self._updated = now
+
+    def wait_time(self, needed):
+        """Seconds until `needed` tokens are available."""
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+
+# -----------------------------
+#  QUOTA SCHEDULER
+# -----------------------------
+class QuotaScheduler:
+    """
+    Accounts every upstream call against several windows at once
+    (e.g. per minute, hour and day); a call needs a token from each.
+
+    INTERACTIVE calls may spend every token and never wait: if a window
+    is empty they raise QuotaExceeded, so the caller can fall back to
+    stale data. BACKGROUND calls (prefetch, warm-up, revalidation) only
+    spend tokens above a reserve kept for interactive traffic, and wait
+    for the buckets to refill rather than fail.
+    """
+
+    def __init__(self, limits, background_reserve=0.25):
+        self.buckets = [TokenBucket(capacity, period)
+                        for capacity, period in limits]
+        self.background_reserve = background_reserve
+        self._cond = threading.Condition()
+        self.granted = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.denied = {INTERACTIVE: 0, BACKGROUND: 0}
+
+    def _needed(self, bucket, priority):
+        if priority == BACKGROUND:
+            return min(bucket.capacity,
+                       1 + bucket.capacity * self.background_reserve)
+        return 1
+
+    def _try_acquire(self, priority):
+        """Take one token from every bucket, or return the wait time."""
+        now = time.monotonic()
+        wait = 0.0
+        for bucket in self.buckets:
+            bucket.refill(now)
+            wait = max(wait, bucket.wait_time(self._needed(bucket, priority)))
+        if wait > 0:
+            return wait
+
+        for bucket in self.buckets:
+            bucket.tokens -= 1
+        self.granted[priority] += 1
+        return 0.0
+
+    def acquire(self, priority=INTERACTIVE, timeout=None):
+        """
+        Spend one call's worth of quota. Interactive calls never block;
+        background calls wait up to timeout seconds (None = forever).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._cond:
+            while True:
+                wait = self._try_acquire(priority)
+                if wait == 0:
+                    return
+
+                if priority == INTERACTIVE:
+                    self.denied[priority] += 1
+                    raise QuotaExceeded("ESV quota exhausted")
+
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.denied[priority] += 1
+                        raise QuotaExceeded("ESV quota exhausted")
+                    wait = min(wait, remaining)
+                self._cond.wait(wait)
+
+    def refund(self, priority=INTERACTIVE):
+        """Give back a token taken by acquire() for a call never sent."""
+        with self._cond:
+            for bucket in self.buckets:
+                bucket.tokens = min(bucket.capacity, bucket.tokens + 1)
+            self.granted[priority] -= 1
+            self._cond.notify_all()
+
+    def charge(self, used):
+        """
+        Count tokens spent by another process against these buckets;
+        used maps a window's period (seconds) to the tokens it spent.
+        """
+        with self._cond:
+            now = time.monotonic()
+            for bucket in self.buckets:
+                bucket.refill(now)
+                spent = used.get(bucket.period, 0)
+                bucket.tokens = max(0.0, bucket.tokens - spent)
+
+    def usage(self):
+        """Current budget per window, for /quota and metrics."""
+        with self._cond:
+            now = time.monotonic()
+            windows = []
+            for bucket in self.buckets:
+                bucket.refill(now)
+                windows.append({
+                    "period": bucket.period,
+                    "limit": bucket.capacity,
+                    "available": round(bucket.tokens, 2),
+                    "used": round(bucket.capacity - bucket.tokens, 2),
+                })
+            return {
+                "windows": windows,
+                "granted": dict(self.granted),
+                "denied": dict(self.denied),
+            }
@@ -0,0 +1,318 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# -----------------------------
+#  BOOKS
+# -----------------------------
+# (canonical name, chapter count, extra abbreviations)
+BOOKS = [
+    ("Genesis", 50, ["gn", "gen"]),
+    ("Exodus", 40, ["ex", "exod"]),
+    ("Leviticus", 27, ["lv", "lev"]),
+    ("Numbers", 36, ["nm", "nu", "num"]),
+    ("Deuteronomy", 34, ["dt", "deut"]),
+    ("Joshua", 24, ["jos", "josh"]),
+    ("Judges", 21, ["jdg", "jdgs", "judg"]),
+    ("Ruth", 4, ["rt", "ru"]),
+    ("1 Samuel", 31, ["1sa", "1sam", "1sm"]),
+    ("2 Samuel", 24, ["2sa", "2sam", "2sm"]),
+    ("1 Kings", 22, ["1ki", "1kgs"]),
+    ("2 Kings", 25, ["2ki", "2kgs"]),
+    ("1 Chronicles", 29, ["1ch", "1chr", "1chron"]),
+    ("2 Chronicles", 36, ["2ch", "2chr", "2chron"]),
+    ("Ezra", 10, ["ezr"]),
+    ("Nehemiah", 13, ["ne", "neh"]),
+    ("Esther", 10, ["es", "est", "esth"]),
+    ("Job", 42, ["jb"]),
+    ("Psalm", 150, ["ps", "psa", "pss", "psalms", "psm"]),
+    ("Proverbs", 31, ["pr", "prv", "prov"]),
+    ("Ecclesiastes", 12, ["ec", "ecc", "eccl", "qoh"]),
+    ("Song of Solomon", 8, ["song", "sos", "songofsongs", "canticles"]),
+    ("Isaiah", 66, ["is", "isa"]),
+    ("Jeremiah", 52, ["je", "jer"]),
+    ("Lamentations", 5, ["la", "lam"]),
+    ("Ezekiel", 48, ["ezk", "eze", "ezek"]),
+    ("Daniel", 12, ["dn", "da", "dan"]),
+    ("Hosea", 14, ["ho", "hos"]),
+    ("Joel", 3, ["jl"]),
+    ("Amos", 9, ["am"]),
+    ("Obadiah", 1, ["ob", "obad"]),
+    ("Jonah", 4, ["jnh", "jon"]),
+    ("Micah", 7, ["mi", "mic"]),
+    ("Nahum", 3, ["na", "nah"]),
+    ("Habakkuk", 3, ["hab"]),
+    ("Zephaniah", 3, ["zep", "zeph"]),
+    ("Haggai", 2, ["hag", "hg"]),
+    ("Zechariah", 14, ["zec", "zech"]),
+    ("Malachi", 4, ["mal"]),
+    ("Matthew", 28, ["mt", "matt"]),
+    ("Mark", 16, ["mk", "mr"]),
+    ("Luke", 24, ["lk"]),
+    ("John", 21, ["jn", "jhn"]),
+    ("Acts", 28, ["ac"]),
+    ("Romans", 16, ["rm", "ro", "rom"]),
+    ("1 Corinthians", 16, ["1co", "1cor"]),
+    ("2 Corinthians", 13, ["2co", "2cor"]),
+    ("Galatians", 6, ["ga", "gal"]),
+    ("Ephesians", 6, ["eph"]),
+    ("Philippians", 4, ["php", "phil", "pp"]),
+    ("Colossians", 4, ["col"]),
+    ("1 Thessalonians", 5, ["1th", "1thess"]),
+    ("2 Thessalonians", 3, ["2th", "2thess"]),
+    ("1 Timothy", 6, ["1ti", "1tim"]),
+    ("2 Timothy", 4, ["2ti", "2tim"]),
+    ("Titus", 3, ["tit"]),
+    ("Philemon", 1, ["phm", "philem"]),
+    ("Hebrews", 13, ["heb"]),
+    ("James", 5, ["jas", "jm"]),
+    ("1 Peter", 5, ["1pe", "1pet", "1pt"]),
+    ("2 Peter", 3, ["2pe", "2pet", "2pt"]),
+    ("1 John", 5, ["1jn", "1jo", "1jhn"]),
+    ("2 John", 1, ["2jn", "2jo", "2jhn"]),
+    ("3 John", 1, ["3jn", "3jo", "3jhn"]),
+    ("Jude", 1, ["jud", "jd"]),
+    ("Revelation", 22, ["re", "rev", "rv", "revelations"]),
+]
+
+BOOK_NAMES = [name for name, _, _ in BOOKS]
+CHAPTERS = {name: chapters for name, chapters, _ in BOOKS}
+
+
+def _alias_key(text):
+    return re.sub(r"[^0-9a-z]", "", text.lower())
+
+
+def _build_aliases():
+    aliases = {}
+
+    # Every unambiguous prefix of a full name ("gene", "1cori", ...)
+    prefixes = {}
+    for name in BOOK_NAMES:
+        key = _alias_key(name)
+        start = 3 if key[0].isdigit() else 2
+        for i in range(start, len(key) + 1):
+            prefixes.setdefault(key[:i], set()).add(name)
+    for prefix, names in prefixes.items():
+        if len(names) == 1:
+            aliases[prefix] = next(iter(names))
+
+    # Full names and explicit abbreviations always win.
+    for name, _, extra in BOOKS:
+        aliases[_alias_key(name)] = name
+        for abbr in extra:
+            aliases[abbr] = name
+
+    return aliases
+
+
+ALIASES = _build_aliases()
+
+
+def resolve_book(name):
+    """Canonical book name for a name or abbreviation, or None."""
+    key = _alias_key(name)
+    for word, digit in (("iii", "3"), ("ii", "2"), ("i", "1"),
+                        ("first", "1"), ("second", "2"), ("third", "3")):
+        if name.lower().startswith(word + " "):
+            key = digit + key[len(word):]
+            break
+    return ALIASES.get(key)
+
+# -----------------------------
+#  STRUCTURED FORM
+# -----------------------------
+Passage = namedtuple("Passage", "book segments")
+
+# Verses are None for whole-chapter segments.
+Segment = namedtuple(
+    "Segment", "start_chapter start_verse end_chapter end_verse")
+
+
+class InvalidReference(ValueError):
+    pass
+
+
+def verse_id(book, chapter, verse):
+    """Numeric BBCCCVVV id, ordered the same way as the Bible."""
+    return (BOOK_NAMES.index(book) + 1) * 1000000 + chapter * 1000 + verse
+
+
+# -----------------------------
+#  PARSER
+# -----------------------------
+_ORDINALS = re.compile(r"^(iii|ii|i|first|second|third)\s+(?=[a-z])")
+_ORDINAL_DIGITS = {"i": "1", "ii": "2", "iii": "3",
+                   "first": "1", "second": "2", "third": "3"}
+_BOOK = re.compile(r"^([1-3]?\s*[a-z][a-z\s]*?)\.?\s*(?=\d|$)")
+_ITEM = re.compile(r"^(\d+)(?::(\d+))?(?:-(\d+)(?::(\d+))?)?$")
+
+
+def _fix_mojibake(text):
+    # UTF-8 dashes that were decoded as cp1252, as in interpretations.json.
+    if "\u00e2" in text:
+        try:
+            return text.encode("cp1252").decode("utf-8")
+        except UnicodeError:
+            pass
+    return text
+
+
+def _clean(text):
+    text = _fix_mojibake(text).lower()
+    text = re.sub(r"[\u2010-\u2015\u2212]", "-", text)
+    text = re.sub(r"(?<=\d)\s*\.\s*(?=\d)", ":", text)
+    text = re.sub(r"\s*([:,;-])\s*", r"\1", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _parse_items(book, rest, text):
+    single = CHAPTERS[book] == 1
+    segments = []
+    chapter = None
+    verse_mode = False
+
+    for item in rest.split(","):
+        m = _ITEM.match(item)
+        if not m:
+            raise InvalidReference(f"Cannot parse reference: {text!r}")
+
+        a, b, c, d = (int(g) if g else None for g in m.groups())
+
+        if b is not None:
+            # ch:v, ch:v-v or ch:v-ch:v
+            chapter, verse_mode = a, True
+            if d is not None:
+                seg = Segment(a, b, c, d)
+            else:
+                seg = Segment(a, b, a, c if c is not None else b)
+        elif verse_mode or single:
+            # Bare numbers continue the current chapter's verses.
+            if chapter is None:
+                chapter = 1
+            verse_mode = True
+            if d is not None:
+                seg = Segment(chapter, a, c, d)
+            else:
+                seg = Segment(chapter, a, chapter, c if c is not None else a)
+        elif d is not None:
+            # ch-ch:v
+            seg = Segment(a, 1, c, d)
+            verse_mode = True
+        else:
+            seg = Segment(a, None, c if c is not None else a, None)
+
+        chapter = seg.end_chapter
+
+        if seg.start_chapter < 1 or seg.end_chapter > CHAPTERS[book]:
+            raise InvalidReference(
+                f"{book} has {CHAPTERS[book]} chapters: {text!r}")
+        start = (seg.start_chapter, seg.start_verse or 0)
+        end = (seg.end_chapter, seg.end_verse or 0)
+        if start > end or seg.start_verse == 0:
+            raise InvalidReference(f"Invalid range in reference: {text!r}")
+
+        segments.append(seg)
+
+    return segments
+
+
+@lru_cache(maxsize=4096)
+def _parse(text):
+    cleaned = _clean(text)
+    if not cleaned:
+        raise InvalidReference("Empty reference")
+
+    passages = []
+    book = None
+
+    for part in cleaned.split(";"):
+        part = _ORDINALS.sub(lambda m: _ORDINAL_DIGITS[m.group(1)], part)
+        m = _BOOK.match(part)
+        if m:
+            name = ALIASES.get(_alias_key(m.group(1)))
+            if name is None:
+                raise InvalidReference(f"Unknown book in reference: {text!r}")
+            book = name
+            rest = part[m.end():].replace(" ", "")
+        elif book is not None:
+            rest = part.replace(" ", "")
+        else:
+            raise InvalidReference(f"Missing book in reference: {text!r}")
+
+        if not rest:
+            # A bare book name means the whole book.
+            segments = [Segment(1, None, CHAPTERS[book], None)]
+        else:
+            segments = _parse_items(book, rest, text)
+
+        passages.append(Passage(book, tuple(segments)))
+
+    return tuple(passages)
+
+
+def parse(text):
+    """
+    Parse free text ("jn 3.16", "Proverbs 3:5-6; Rom 8:28, 31") into a
+    tuple of Passage. Raises InvalidReference.
+    """
+    return _parse(text)
+
+
+# -----------------------------
+#  CANONICAL STRING
+# -----------------------------
+def _format_point(chapter, verse, single):
+    if verse is None:
+        return str(chapter)
+    if single:
+        return str(verse)
+    return f"{chapter}:{verse}"
+
+
+def format_passage(passage):
+    single = CHAPTERS[passage.book] == 1
+    parts = []
+    prev_chapter = None
+
+    for seg in passage.segments:
+        whole_book = (seg.start_verse is None and seg.start_chapter == 1
+                      and seg.end_chapter == CHAPTERS[passage.book])
+        if whole_book:
+            parts.append("")
+            continue
+
+        if (seg.start_verse is not None and not single
+                and seg.start_chapter == prev_chapter):
+            start = str(seg.start_verse)
+        else:
+            start = _format_point(seg.start_chapter, seg.start_verse, single)
+
+        if (seg.start_chapter, seg.start_verse) == (seg.end_chapter, seg.end_verse):
+            text = start
+        elif seg.start_chapter == seg.end_chapter and seg.end_verse is not None:
+            text = f"{start}-{seg.end_verse}"
+        else:
+            text = f"{start}-{_format_point(seg.end_chapter, seg.end_verse, single)}"
+
+        parts.append(text)
+        prev_chapter = seg.end_chapter if seg.end_verse is not None else None
+
+    return f"{passage.book} {', '.join(parts)}".strip()
+
+
+def canonicalize(text):
+    """Canonical string for a reference. Raises InvalidReference."""
+    return "; ".join(format_passage(p) for p in parse(text))
+
+
+@lru_cache(maxsize=4096)
+def normalize(text):
+    """
+    Canonical form when the text parses, otherwise the trimmed input.
+    Use this for cache and interpretation keys.
+    """
+    try:
+        return canonicalize(text)
+    except InvalidReference:
+        return _fix_mojibake(text).strip()
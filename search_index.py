@@ -0,0 +1,139 @@
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+_TOKEN = re.compile(r"[0-9a-z]+")
+
+# Shorter words (verse numbers, "a") only match whole terms.
+MIN_PREFIX = 2
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+
+# -----------------------------
+#  INVERTED INDEX
+# -----------------------------
+class InvertedIndex:
+    """
+    In-memory full-text index with prefix matching and TF-IDF ranking.
+
+    Documents are added and removed one at a time, so a store can keep
+    the index current on every save without rebuilding it. The sorted
+    term list is rebuilt lazily, only when a search follows new terms.
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(dict)   # term -> {doc_id: count}
+        self._doc_terms = {}                 # doc_id -> {term: count}
+        self._terms = []
+        self._terms_dirty = False
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def add(self, doc_id, text):
+        counts = defaultdict(int)
+        for token in tokenize(text):
+            counts[token] += 1
+
+        with self._lock:
+            self._remove(doc_id)
+            for term, count in counts.items():
+                if term not in self._postings:
+                    self._terms_dirty = True
+                self._postings[term][doc_id] = count
+            self._doc_terms[doc_id] = dict(counts)
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        for term in self._doc_terms.pop(doc_id, {}):
+            docs = self._postings[term]
+            docs.pop(doc_id, None)
+            if not docs:
+                del self._postings[term]
+                self._terms_dirty = True
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._terms = []
+            self._terms_dirty = False
+
+    def _expand(self, prefix):
+        """All indexed terms starting with prefix."""
+        if len(prefix) < MIN_PREFIX:
+            if prefix in self._postings:
+                yield prefix
+            return
+
+        if self._terms_dirty:
+            self._terms = sorted(self._postings)
+            self._terms_dirty = False
+
+        i = bisect_left(self._terms, prefix)
+        while i < len(self._terms) and self._terms[i].startswith(prefix):
+            yield self._terms[i]
+            i += 1
+
+    def search(self, query, limit=20):
+        """
+        Documents matching every query word as a prefix, best first.
+        Returns [(doc_id, score)].
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+
+        with self._lock:
+            total = len(self._doc_terms) or 1
+
+            # Weigh each word's expansions, then start from the rarest word
+            # so the candidate set is as small as possible from the outset.
+            expanded = []
+            for word in dict.fromkeys(words):
+                terms = {}
+                for term in self._expand(word):
+                    idf = math.log(1 + total / len(self._postings[term]))
+                    # Exact matches outrank prefix expansions.
+                    terms[term] = idf if term == word else idf * 0.5
+                postings = sum(len(self._postings[t]) for t in terms)
+                expanded.append((postings, word, terms))
+            expanded.sort()
+
+            scores = None
+            for postings, word, terms in expanded:
+                if not terms:
+                    return []
+
+                word_scores = defaultdict(float)
+                if scores is not None and len(scores) < postings:
+                    # Few candidates left: check their own terms instead
+                    # of walking every posting list.
+                    for doc_id in scores:
+                        for term, count in self._doc_terms[doc_id].items():
+                            if term in terms:
+                                word_scores[doc_id] += terms[term] * (1 + math.log(count))
+                else:
+                    for term, weight in terms.items():
+                        for doc_id, count in self._postings[term].items():
+                            word_scores[doc_id] += weight * (1 + math.log(count))
+
+                if scores is None:
+                    scores = word_scores
+                else:
+                    scores = {doc: s + word_scores[doc]
+                              for doc, s in scores.items() if doc in word_scores}
+                if not scores:
+                    return []
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
@@ -1,92 +1,561 @@
-import json
-import requests
-from flask import Flask, request, jsonify, send_from_directory
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, request, jsonify, g
+
+import esv_client
+import metrics
+from access_log import open_access_log
+from batcher import UpstreamBatcher
+from interpretation_store import open_interpretation_store
+from passage_cache import PassageCache, SQLitePassageCache, make_key
+from local_corpus import LocalCorpus
+from references import InvalidReference, canonicalize, normalize
+from quota import BACKGROUND, INTERACTIVE
+from singleflight import SingleFlight
+from static_assets import StaticAssets
+
+# /static is served from memory by static_file() below.
+app = Flask(__name__, static_folder=None)
+
+# -----------------------------
+#  METRICS
+# -----------------------------
+# Each worker writes its totals under METRICS_DIR so /metrics can add
+# up every worker (gunicorn.conf.py sets it). Empty: this process only.
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+if METRICS_DIR:
+    metrics.registry.enable_multiprocess(METRICS_DIR)
+
+REQUEST_SECONDS = metrics.histogram(
+    "bible_http_request_duration_seconds",
+    "Time to answer a request, by route.",
+    ["method", "route"])
+REQUESTS = metrics.counter(
+    "bible_http_requests_total",
+    "Requests answered, by route and status.",
+    ["method", "route", "status"])
+
+# /lookup and /save_interpretation each add one JSON line to ACCESS_LOG
+# (requests.jsonl) through a background writer. ACCESS_LOG="" disables it.
+access_log = open_access_log()
 
-app = Flask(__name__)
+
+@app.before_request
+def start_timer():
+    g.started = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    started = g.pop("started", None)
+    if started is not None:
+        # The rule, not the path, so /static/<path:name> is one series.
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                method=request.method, route=route)
+        REQUESTS.inc(method=request.method, route=route,
+                     status=response.status_code)
+
+        record = g.pop("access", None)
+        if record is not None and access_log is not None:
+            elapsed = time.perf_counter() - started
+            record.update(
+                ts=round(time.time() - elapsed, 3),  # when it arrived
+                method=request.method,
+                route=route,
+                status=response.status_code,
+                total_ms=round(elapsed * 1000, 2),
+            )
+            access_log.log(record)
+    return response
+
+
+# -----------------------------
+#  PASSAGE CACHE
+# -----------------------------
+# Shared on-disk store so every gunicorn worker (and the next deploy)
+# starts warm. Set PASSAGE_CACHE_DB="" to keep the cache in memory only.
+PASSAGE_CACHE_DB = os.environ.get("PASSAGE_CACHE_DB", "passage_cache.sqlite3")
+
+passage_cache = PassageCache(
+    max_entries=int(os.environ.get("PASSAGE_CACHE_SIZE", 1024)),
+    ttl=int(os.environ.get("PASSAGE_CACHE_TTL", 24 * 60 * 60)),
+    backend=SQLitePassageCache(PASSAGE_CACHE_DB) if PASSAGE_CACHE_DB else None,
+)
+
+# Expired passages stay on disk this long so they can still be served
+# stale while ESV is down; older rows are dropped when a worker starts.
+PASSAGE_CACHE_GRACE = int(os.environ.get("PASSAGE_CACHE_GRACE", 7 * 24 * 60 * 60))
+if passage_cache.backend is not None:
+    passage_cache.backend.purge_expired(PASSAGE_CACHE_GRACE)
+
+CACHE_ENTRIES = metrics.gauge(
+    "bible_passage_cache_entries", "Passages held in memory by each worker.")
+metrics.registry.add_collector(
+    lambda: CACHE_ENTRIES.set(len(passage_cache)))
 
 # -----------------------------
 #  ESV API LOOKUP
 # -----------------------------
-ESV_API_KEY = "7580d95a1be11f5097f01d04f98f6d6d999d2768"
+ESV_PARAMS = {
+    "include-passage-references": False,
+    "include-verse-numbers": True,
+    "include-first-verse-numbers": True,
+    "include-footnotes": True,
+    "include-footnote-body": True,
+    "include-footnote-markers": True,
+    "include-headings": False,
+    "include-short-copyright": False,
+}
 
 
-def fetch_bible_verse(reference):
-    url = "https://api.esv.org/v3/passage/text/"
-    headers = {"Authorization": f"Token {ESV_API_KEY}"}
-
-    params = {
-        "q": reference,
-        "include-passage-references": False,
-        "include-verse-numbers": True,
-        "include-first-verse-numbers": True,
-        "include-footnotes": True,
-        "include-footnote-body": True,
-        "include-footnote-markers": True,
-        "include-headings": False,
-        "include-short-copyright": False,
-    }
+def format_passage(passage, footnotes):
+    # Main verse text
+    verse_text = passage.strip()
 
-    try:
-        r = requests.get(url, headers=headers, params=params, timeout=10)
-        r.raise_for_status()
-        data = r.json()
+    # Add footnotes only if present
+    if footnotes:
+        verse_text += "\n\nFOOTNOTES:\n"
+        for fn in footnotes:
+            verse_text += f"- {fn}\n"
+
+    return verse_text
+
+
+def fetch_passages(references, priority=INTERACTIVE):
+    """
+    Fetch several references with one ESV query ("a; b; c").
+    Returns one verse text (or None if not found) per reference; when
+    a batch falls back to one query per reference, a reference whose
+    own query failed gets that exception instead.
+    """
+    data = esv_client.get(
+        dict(ESV_PARAMS, q="; ".join(references)), priority=priority)
 
-        passages = data.get("passages", [])
-        footnotes = data.get("footnotes", [])
+    passages = data.get("passages", [])
+    footnotes = data.get("footnotes", [])
 
+    if len(references) == 1:
         if not passages:
-            return "Verse not found."
+            return [None]
+        return [format_passage(passages[0], footnotes)]
+
+    # ESV silently drops references it can't resolve, so only trust a
+    # positional fan-out when every reference got its own passage.
+    # Footnotes come back as one list for the whole query and can't be
+    # attributed to a passage; fetch those one by one as well, so a
+    # cached passage reads the same whether or not it was batched.
+    if len(passages) != len(references) or footnotes:
+        return _fetch_each(references, priority)
+
+    return [format_passage(p, []) for p in passages]
+
+
+def _fetch_each(references, priority):
+    # One failure must not discard (or fail) the others: they are
+    # already paid for, and batched waiters are independent lookups.
+    results = []
+    for reference in references:
+        try:
+            results.append(fetch_passages([reference], priority)[0])
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+# Concurrent misses arriving within ESV_BATCH_WINDOW_MS are sent to ESV
+# as one multi-reference query. Off (0) by default: a sync worker never
+# has two misses in flight, so every miss would only wait out the
+# window. gunicorn.conf.py turns it on for threaded workers.
+ESV_BATCH_WINDOW_MS = float(os.environ.get("ESV_BATCH_WINDOW_MS", 0))
+
+ESV_BATCH_MAX = int(os.environ.get("ESV_BATCH_MAX", 20))
 
-        # Main verse text
-        verse_text = passages[0].strip()
+batcher = None
+if ESV_BATCH_WINDOW_MS > 0:
+    batcher = UpstreamBatcher(
+        fetch_passages,
+        window=ESV_BATCH_WINDOW_MS / 1000,
+        max_batch=ESV_BATCH_MAX,
+    )
 
-        # Add footnotes only if present
-        if footnotes:
-            verse_text += "\n\nFOOTNOTES:\n"
-            for fn in footnotes:
-                verse_text += f"- {fn}\n"
 
-        return verse_text
+# -----------------------------
+#  LOCAL CORPUS
+# -----------------------------
+# Optional offline text (see local_corpus.py). When LOCAL_CORPUS points
+# at a corpus file, verses come from its memory map instead of ESV.
+LOCAL_CORPUS = os.environ.get("LOCAL_CORPUS", "")
+local_corpus = LocalCorpus(LOCAL_CORPUS) if LOCAL_CORPUS else None
+
+
+# Identical concurrent misses share one upstream call per worker. With
+# ESV_SINGLEFLIGHT_SHARED=1, workers also coalesce through a fill lock
+# in the shared SQLite cache.
+single_flight = SingleFlight()
+SINGLEFLIGHT_SHARED = os.environ.get("ESV_SINGLEFLIGHT_SHARED", "0") == "1"
+
+
+def _fetch_and_store(reference, key, priority=INTERACTIVE):
+    # References that already list several passages go on their own.
+    if batcher is not None and ";" not in reference and priority == INTERACTIVE:
+        verse_text = batcher.submit(reference)
+    else:
+        verse_text = fetch_passages([reference], priority)[0]
+
+    if verse_text is not None:
+        passage_cache.set(key, verse_text)
+    return verse_text
+
+
+def _fetch_upstream(reference, key, priority=INTERACTIVE):
+    backend = passage_cache.backend
+    if not SINGLEFLIGHT_SHARED or backend is None:
+        return _fetch_and_store(reference, key, priority)
+
+    if not backend.try_lock(key):
+        # Another worker is fetching it; wait for its result.
+        if backend.wait_for(key) is not None:
+            return passage_cache.get(key)
+
+    try:
+        return _fetch_and_store(reference, key, priority)
+    finally:
+        backend.unlock(key)
+
+
+# -----------------------------
+#  STALE-WHILE-REVALIDATE
+# -----------------------------
+revalidate_pool = ThreadPoolExecutor(
+    max_workers=2, thread_name_prefix="revalidate")
+_revalidating = set()
+_revalidating_lock = threading.Lock()
 
+
+def revalidate(reference, key):
+    """
+    Refresh a stale passage in the background. While the breaker is
+    open this fails fast; once it half-opens, this is the probe.
+    """
+    with _revalidating_lock:
+        if key in _revalidating:
+            return
+        _revalidating.add(key)
+
+    # A background call may wait up to ESV_BACKGROUND_WAIT for quota.
+    # Interactive misses must not queue behind it, so it gets its own
+    # single-flight key and skips the cross-worker fill lock.
+    def run():
+        try:
+            single_flight.do(
+                (BACKGROUND, key),
+                lambda: _fetch_and_store(reference, key, BACKGROUND))
+        except Exception:
+            pass
+        finally:
+            with _revalidating_lock:
+                _revalidating.discard(key)
+
+    revalidate_pool.submit(run)
+
+
+def fetch_bible_verse(reference):
+    if local_corpus is not None:
+        try:
+            verse_text = local_corpus.passage_text(reference)
+        except InvalidReference:
+            verse_text = None
+        return verse_text if verse_text is not None else "Verse not found."
+
+    key = make_key(reference, ESV_PARAMS)
+    cached = passage_cache.get(key)
+    if cached is not None:
+        return cached
+    return fetch_missing_verse(reference, key)
+
+
+def fetch_missing_verse(reference, key):
+    """
+    The rest of fetch_bible_verse, for callers that have already
+    missed the passage cache under key (so it is not counted twice).
+    """
+    try:
+        verse_text = single_flight.do(
+            key, lambda: _fetch_upstream(reference, key))
     except Exception as e:
+        # Upstream failed or the breaker is open: serve the last good
+        # copy at once and refresh it in the background.
+        stale = passage_cache.get_stale(key)
+        if stale is not None:
+            revalidate(reference, key)
+            return stale
         return f"Error fetching verse: {e}"
 
+    if verse_text is None:
+        return "Verse not found."
+
+    return verse_text
+
+
+def fetch_bible_verses(references, priority=INTERACTIVE):
+    """
+    Batch form of fetch_bible_verse. Cached references resolve
+    immediately and ones that don't parse are answered locally; the
+    misses go to ESV in combined queries of up to ESV_BATCH_MAX
+    references. Returns {reference: verse_text}.
+    """
+    if local_corpus is not None:
+        return {ref: fetch_bible_verse(ref) for ref in references}
+
+    results = {}
+    misses = []
+
+    for reference in dict.fromkeys(references):
+        # ESV would drop it from a combined query, and the whole chunk
+        # would then be re-fetched one reference at a time.
+        try:
+            canonicalize(reference)
+        except InvalidReference:
+            results[reference] = "Verse not found."
+            continue
+
+        key = make_key(reference, ESV_PARAMS)
+        cached = passage_cache.get(key)
+        if cached is not None:
+            results[reference] = cached
+        elif ";" in reference:
+            results[reference] = fetch_missing_verse(reference, key)
+        else:
+            misses.append(reference)
+
+    for i in range(0, len(misses), ESV_BATCH_MAX):
+        chunk = misses[i:i + ESV_BATCH_MAX]
+        try:
+            texts = fetch_passages(chunk, priority)
+        except Exception as e:
+            texts = [e] * len(chunk)
+
+        for reference, verse_text in zip(chunk, texts):
+            if isinstance(verse_text, Exception):
+                key = make_key(reference, ESV_PARAMS)
+                stale = passage_cache.get_stale(key)
+                if stale is not None:
+                    revalidate(reference, key)
+                    results[reference] = stale
+                else:
+                    results[reference] = f"Error fetching verse: {verse_text}"
+            elif verse_text is None:
+                results[reference] = "Verse not found."
+            else:
+                passage_cache.set(make_key(reference, ESV_PARAMS), verse_text)
+                results[reference] = verse_text
+
+    return results
+
+
+# -----------------------------
+#  INTERPRETATIONS
+# -----------------------------
+# SQLite by default (seeded from interpretations.json on first run);
+# INTERPRETATION_STORE=json keeps the journaled JSON file instead.
+interpretation_store = open_interpretation_store("interpretations.json")
+
 
 # -----------------------------
 #  SERVE INDEX.HTML
 # -----------------------------
+# Pages and assets are read and compressed once, then served from
+# memory; they reload only when the file changes on disk.
+page_assets = StaticAssets(".")
+static_assets = StaticAssets("static")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def send_asset(asset, cache_control):
+    encoding = asset.encoding_for(request.accept_encodings.quality)
+
+    response = app.response_class(
+        asset.bodies[encoding], content_type=asset.content_type)
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = cache_control
+    # Each encoding is its own representation, so its own strong ETag.
+    response.set_etag(f"{asset.etag}-{encoding}")
+    return response.make_conditional(request)
+
+
 @app.route("/")
 def index():
-    return send_from_directory(".", "index.html")
+    asset = page_assets.get("index.html")
+    if asset is None:
+        return jsonify({"error": "Not found"}), 404
+    # The page URL is not versioned: always revalidate (a cheap 304).
+    return send_asset(asset, "no-cache")
+
+
+@app.route("/static/<path:name>")
+def static_file(name):
+    asset = static_assets.get(name)
+    if asset is None:
+        return jsonify({"error": "Not found"}), 404
+    # /static/app.js?v=<etag> never changes, so it may be cached forever.
+    if request.args.get("v") == asset.etag:
+        return send_asset(asset, IMMUTABLE)
+    return send_asset(asset, "no-cache")
 
 
 # -----------------------------
 #  LOOKUP ROUTE
 # -----------------------------
+# Browsers and a fronting proxy may reuse a lookup for max-age and
+# serve it stale while revalidating; revalidation is a cheap 304.
+LOOKUP_CACHE_CONTROL = os.environ.get(
+    "LOOKUP_CACHE_CONTROL", "public, max-age=60, stale-while-revalidate=600")
+
+
+def lookup_etag(reference, verse_text, interp):
+    """Strong ETag over the passage text and the interpretation."""
+    digest = hashlib.sha256()
+    for part in (reference, verse_text, interp):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:32]
+
+
+def cached_verse(reference):
+    """The verse text if we have it without an upstream call, else None."""
+    if local_corpus is not None:
+        return fetch_bible_verse(reference)
+    return passage_cache.get(make_key(reference, ESV_PARAMS))
+
+
 @app.route("/lookup")
 def lookup():
-    reference = request.args.get("reference", "").strip()
+    reference = normalize(request.args.get("reference", ""))
 
-    # Get verse text (single return value)
-    verse_text = fetch_bible_verse(reference)
+    # Flat string interpretation
+    interp = interpretation_store.get_interpretation(reference)
 
-    # Load interpretations.json
-    try:
-        with open("interpretations.json", "r") as f:
-            interpretations = json.load(f)
-    except:
-        interpretations = {}
+    # Answer a matching If-None-Match before going anywhere near ESV.
+    verse_text = cached_verse(reference)
+    g.access = {"reference": reference,
+                "cache": ("local" if local_corpus is not None
+                          else "miss" if verse_text is None else "hit"),
+                "upstream_ms": 0}
+    if verse_text is not None and request.if_none_match:
+        etag = lookup_etag(reference, verse_text, interp)
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = LOOKUP_CACHE_CONTROL
+            response.headers["X-Cache"] = g.access["cache"]
+            return response
 
-    # Flat string interpretation
-    interp = interpretations.get(reference, {}).get("interpretation", "")
+    # Get verse text (single return value)
+    if verse_text is None:
+        started = time.perf_counter()
+        verse_text = fetch_missing_verse(
+            reference, make_key(reference, ESV_PARAMS))
+        g.access["upstream_ms"] = round((time.perf_counter() - started) * 1000, 2)
 
     # Return JSON that matches your HTML
-    return jsonify({
+    response = jsonify({
         "reference": reference,
         "verse": reference,
         "verse_text": verse_text,
         "interpretation": interp
     })
+    # hit, miss or local; lets replay tools measure the hit ratio.
+    response.headers["X-Cache"] = g.access["cache"]
+
+    if verse_text.startswith("Error fetching verse"):
+        response.headers["Cache-Control"] = "no-store"
+    else:
+        response.set_etag(lookup_etag(reference, verse_text, interp))
+        response.headers["Cache-Control"] = LOOKUP_CACHE_CONTROL
+        response.make_conditional(request)
+    return response
+
+
+# -----------------------------
+#  BATCH LOOKUP ROUTE
+# -----------------------------
+LOOKUP_BATCH_MAX = int(os.environ.get("LOOKUP_BATCH_MAX", 100))
+
+
+@app.route("/lookup_batch", methods=["POST"])
+def lookup_batch():
+    data = request.get_json(silent=True) or {}
+    raw_references = data.get("references")
+
+    if not isinstance(raw_references, list):
+        return jsonify({"error": "Expected a JSON list of references."}), 400
+    if len(raw_references) > LOOKUP_BATCH_MAX:
+        return jsonify({
+            "error": f"At most {LOOKUP_BATCH_MAX} references per batch."
+        }), 400
+
+    if not all(isinstance(ref, str) and ref.strip() for ref in raw_references):
+        return jsonify({"error": "Every reference must be a non-empty string."}), 400
+
+    references = [normalize(ref) for ref in raw_references]
+    verse_texts = fetch_bible_verses(references)
+
+    results = []
+    for reference in references:
+        results.append({
+            "reference": reference,
+            "verse": reference,
+            "verse_text": verse_texts[reference],
+            "interpretation": interpretation_store.get_interpretation(reference),
+        })
+
+    return jsonify({"results": results})
+
+
+# -----------------------------
+#  SEARCH INTERPRETATIONS
+# -----------------------------
+@app.route("/search_interpretations")
+def search_interpretations():
+    query = request.args.get("q", "").strip()
+    limit = max(1, min(request.args.get("limit", 20, type=int), 100))
+
+    results = []
+    for reference, entry, score in interpretation_store.search(query, limit):
+        results.append({
+            "reference": reference,
+            "verse": entry.get("verse", reference),
+            "interpretation": entry.get("interpretation", ""),
+            "score": round(score, 4),
+        })
+
+    return jsonify({"query": query, "results": results})
+
+
+# -----------------------------
+#  ESV QUOTA
+# -----------------------------
+@app.route("/quota")
+def quota():
+    return jsonify(esv_client.quota.usage())
+
+
+# -----------------------------
+#  METRICS ROUTE
+# -----------------------------
+@app.route("/metrics")
+def metrics_route():
+    return app.response_class(metrics.registry.render(),
+                              content_type=metrics.CONTENT_TYPE)
+
+
 # -----------------------------
 #  SAVE INTERPRETATION
 # -----------------------------
@@ -94,26 +563,23 @@ def lookup():
 
 @app.route("/save_interpretation", methods=["POST"])
 def save_interpretation():
-    data = request.get_json()
-    reference = data["reference"]
-    interpretation = data["interpretation"]
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
+    reference = data.get("reference")
+    interpretation = data.get("interpretation")
 
-    # Load existing interpretations
-    try:
-        with open("interpretations.json", "r") as f:
-            interpretations = json.load(f)
-    except:
-        interpretations = {}
+    if not (isinstance(reference, str) and reference.strip()
+            and isinstance(interpretation, str)):
+        return jsonify({
+            "error": "Expected a reference and interpretation, both strings."
+        }), 400
 
-    # Save in your simple format
-    interpretations[reference] = {
-        "verse": reference,
-        "interpretation": interpretation
-    }
+    reference = normalize(reference)
+    g.access = {"reference": reference, "chars": len(interpretation)}
 
-    # Write back to file
-    with open("interpretations.json", "w") as f:
-        json.dump(interpretations, f, indent=4)
+    # Save in your simple format
+    interpretation_store.set(reference, interpretation)
 
     return jsonify({"status": "ok"})
 
@@ -121,8 +587,6 @@ def save_interpretation():
 # -----------------------------
 #  RUN SERVER
 # -----------------------------
-import os
-
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5005))
     app.run(host="0.0.0.0", port=port)
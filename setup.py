@@ -12,7 +12,12 @@ OPTIONS = {
     'argv_emulation': True,
     'packages': ['flask', 'requests'],
     'iconfile': 'app.icns',
-    'includes': ['server', 'bible_lookup']
+    'includes': ['server', 'bible_lookup', 'esv_client', 'references', 'batcher',
+                 'interpretation_store', 'search_index',
+                 'local_corpus', 'singleflight',
+                 'circuit_breaker', 'quota',
+                 'static_assets', 'metrics',
+                 'access_log']
 }
 
 setup(
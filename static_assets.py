@@ -0,0 +1,101 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+# -----------------------------
+#  STATIC ASSETS
+# -----------------------------
+class Asset:
+    """One file held in memory, raw and pre-compressed."""
+
+    def __init__(self, path):
+        self.path = path
+        self.checked = time.monotonic()
+        self.signature = self._stat_signature()
+
+        with open(path, "rb") as f:
+            body = f.read()
+
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if self.content_type.startswith("text/"):
+            self.content_type += "; charset=utf-8"
+
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.bodies = {"identity": body}
+
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(compressed) < len(body):
+            self.bodies["gzip"] = compressed
+        if brotli is not None:
+            compressed = brotli.compress(body, quality=11)
+            if len(compressed) < len(body):
+                self.bodies["br"] = compressed
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def encoding_for(self, accepts):
+        """
+        Best encoding we have for the client; accepts(name) returns the
+        client's quality for a content-coding.
+        """
+        for encoding in ("br", "gzip"):
+            if encoding in self.bodies and accepts(encoding) > 0:
+                return encoding
+        return "identity"
+
+
+class StaticAssets:
+    """
+    Serves files from memory. Each file is read and compressed on first
+    use and reloaded only when its mtime or size changes (checked at
+    most every check_interval seconds).
+    """
+
+    def __init__(self, directory, check_interval=1.0):
+        self.directory = os.path.abspath(directory)
+        self.check_interval = check_interval
+        self._assets = {}
+        self._lock = threading.Lock()
+
+    def _path(self, name):
+        path = os.path.abspath(os.path.join(self.directory, name))
+        if not path.startswith(self.directory + os.sep):
+            return None
+        return path
+
+    def get(self, name):
+        """The Asset for name, or None if it doesn't exist."""
+        asset = self._assets.get(name)
+        now = time.monotonic()
+
+        if asset is not None:
+            if now - asset.checked < self.check_interval:
+                return asset
+            asset.checked = now
+            if asset._stat_signature() == asset.signature:
+                return asset
+
+        path = self._path(name)
+        if path is None or not os.path.isfile(path):
+            with self._lock:
+                self._assets.pop(name, None)
+            return None
+
+        asset = Asset(path)
+        with self._lock:
+            self._assets[name] = asset
+        return asset
@@ -0,0 +1,100 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batcher import UpstreamBatcher  # noqa: E402
+
+
+class Recorder:
+    """fetch_many stand-in that records every batch it is sent."""
+
+    def __init__(self, delay=0.0, fail=()):
+        self.delay = delay
+        self.fail = set(fail)
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def __call__(self, references):
+        with self._lock:
+            self.batches.append(list(references))
+        time.sleep(self.delay)
+        return [ValueError(ref) if ref in self.fail else ref.upper()
+                for ref in references]
+
+
+def submit_all(batcher, references):
+    results = {}
+    barrier = threading.Barrier(len(references))
+
+    def run(reference):
+        barrier.wait()
+        try:
+            results[reference] = batcher.submit(reference)
+        except Exception as e:
+            results[reference] = e
+
+    threads = [threading.Thread(target=run, args=(ref,)) for ref in references]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_submits_share_one_call():
+    fetch = Recorder()
+    batcher = UpstreamBatcher(fetch, window=0.05, max_batch=20)
+
+    results = submit_all(batcher, ["a", "b", "c"])
+
+    assert results == {"a": "A", "b": "B", "c": "C"}
+    assert sorted(ref for batch in fetch.batches for ref in batch) == ["a", "b", "c"]
+    assert len(fetch.batches) == 1
+
+
+def test_duplicate_references_are_sent_once():
+    fetch = Recorder()
+    batcher = UpstreamBatcher(fetch, window=0.05, max_batch=20)
+
+    results = submit_all(batcher, ["a"] * 5)
+
+    assert results == {"a": "A"}
+    assert fetch.batches == [["a"]]
+
+
+@pytest.mark.parametrize("max_batch", [1, 5, 7])
+def test_batches_never_exceed_max_batch(max_batch):
+    fetch = Recorder(delay=0.01)
+    batcher = UpstreamBatcher(fetch, window=0.05, max_batch=max_batch)
+    references = [f"ref{i}" for i in range(40)]
+
+    results = submit_all(batcher, references)
+
+    assert results == {ref: ref.upper() for ref in references}
+    assert max(len(batch) for batch in fetch.batches) <= max_batch
+    assert sorted(ref for batch in fetch.batches for ref in batch) == sorted(references)
+
+
+def test_full_batch_is_sent_without_waiting_out_the_window():
+    fetch = Recorder()
+    batcher = UpstreamBatcher(fetch, window=5.0, max_batch=3)
+
+    started = time.monotonic()
+    submit_all(batcher, ["a", "b", "c"])
+
+    assert time.monotonic() - started < 1.0
+
+
+def test_one_failure_does_not_fail_the_batch():
+    fetch = Recorder(fail=["b"])
+    batcher = UpstreamBatcher(fetch, window=0.05, max_batch=20)
+
+    results = submit_all(batcher, ["a", "b", "c"])
+
+    assert results["a"] == "A" and results["c"] == "C"
+    assert isinstance(results["b"], ValueError)
@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from circuit_breaker import (  # noqa: E402
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError)
+
+
+def fail():
+    raise RuntimeError("upstream down")
+
+
+def trip(breaker, calls=5):
+    for _ in range(calls):
+        with pytest.raises(RuntimeError):
+            breaker.call(fail)
+
+
+def test_trips_on_failure_rate():
+    breaker = CircuitBreaker(failure_rate=0.5, window=10, min_calls=5)
+    for _ in range(4):
+        with pytest.raises(RuntimeError):
+            breaker.call(fail)
+    assert breaker.state == CLOSED  # below min_calls
+
+    with pytest.raises(RuntimeError):
+        breaker.call(fail)
+    assert breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "text")
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker(min_calls=2, slow_call=0.0)
+    breaker.call(lambda: "text")
+    breaker.call(lambda: "text")
+    assert breaker.state == OPEN
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(min_calls=5, reset_timeout=0.05)
+    trip(breaker)
+    time.sleep(0.06)
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is True
+    assert breaker.allow() is False  # the probe is still out
+
+    breaker.record(True)
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_opens_again():
+    breaker = CircuitBreaker(min_calls=5, reset_timeout=0.05)
+    trip(breaker)
+    time.sleep(0.06)
+
+    with pytest.raises(RuntimeError):
+        breaker.call(fail)
+    assert breaker.state == OPEN
+    assert breaker.stats()["trips"] == 2
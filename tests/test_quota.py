@@ -0,0 +1,76 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quota import (  # noqa: E402
+    BACKGROUND, INTERACTIVE, QuotaExceeded, QuotaScheduler)
+
+
+def test_every_window_is_charged():
+    quota = QuotaScheduler([(10, 60), (100, 3600)])
+    quota.acquire()
+
+    minute, hour = quota.usage()["windows"]
+    assert minute["used"] == pytest.approx(1, abs=0.01)
+    assert hour["used"] == pytest.approx(1, abs=0.01)
+
+
+def test_interactive_fails_fast_when_empty():
+    quota = QuotaScheduler([(2, 3600)])
+    quota.acquire()
+    quota.acquire()
+
+    with pytest.raises(QuotaExceeded):
+        quota.acquire(INTERACTIVE)
+    assert quota.usage()["denied"][INTERACTIVE] == 1
+
+
+def test_background_leaves_the_interactive_reserve():
+    quota = QuotaScheduler([(4, 3600)], background_reserve=0.5)
+    quota.acquire(BACKGROUND)  # 4 left, needs 1 + 2
+    quota.acquire(BACKGROUND)  # 3 left, needs 1 + 2
+
+    with pytest.raises(QuotaExceeded):
+        quota.acquire(BACKGROUND, timeout=0)
+
+    quota.acquire(INTERACTIVE)
+    quota.acquire(INTERACTIVE)
+
+
+def test_background_waits_for_a_refund():
+    quota = QuotaScheduler([(1, 3600)], background_reserve=0)
+    quota.acquire()
+
+    threading.Timer(0.05, quota.refund).start()
+    started = time.monotonic()
+    quota.acquire(BACKGROUND, timeout=5)
+
+    assert time.monotonic() - started < 1
+    assert quota.usage()["granted"] == {INTERACTIVE: 0, BACKGROUND: 1}
+
+
+def test_refund_never_exceeds_capacity():
+    quota = QuotaScheduler([(2, 3600)])
+    quota.acquire()
+    quota.refund()
+    quota.refund()
+
+    (window,) = quota.usage()["windows"]
+    assert window["available"] == 2
+
+
+def test_charge_takes_tokens_from_matching_windows():
+    quota = QuotaScheduler([(10, 60), (100, 3600)])
+    quota.charge({3600: 40})
+
+    minute, hour = quota.usage()["windows"]
+    assert minute["used"] == pytest.approx(0, abs=0.01)
+    assert hour["used"] == pytest.approx(40, abs=0.01)
+
+    quota.charge({60: 50})  # never below empty
+    assert quota.usage()["windows"][0]["available"] == pytest.approx(0, abs=0.01)
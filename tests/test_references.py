@@ -0,0 +1,113 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from references import (  # noqa: E402
+    InvalidReference, Segment, canonicalize, normalize, parse, resolve_book)
+
+
+# -----------------------------
+#  BOOK NAMES
+# -----------------------------
+@pytest.mark.parametrize("text, book", [
+    ("jn", "John"),
+    ("Gen", "Genesis"),
+    ("psalms", "Psalm"),
+    ("revelations", "Revelation"),
+    ("1 cori", "1 Corinthians"),
+    ("ii kings", "2 Kings"),
+    ("first john", "1 John"),
+    ("Song of Solomon", "Song of Solomon"),
+])
+def test_resolve_book(text, book):
+    assert resolve_book(text) == book
+
+
+@pytest.mark.parametrize("text", ["j", "xyz", ""])
+def test_resolve_book_unknown_or_ambiguous(text):
+    assert resolve_book(text) is None
+
+
+# -----------------------------
+#  CANONICAL FORM
+# -----------------------------
+@pytest.mark.parametrize("text, canonical", [
+    ("jn 3.16", "John 3:16"),
+    ("john 3 : 16", "John 3:16"),
+    ("1 cor 13:4-7", "1 Corinthians 13:4-7"),
+    ("I Cor 13", "1 Corinthians 13"),
+    ("first john 1:9", "1 John 1:9"),
+    ("Ps 23", "Psalm 23"),
+    ("gen", "Genesis"),
+])
+def test_abbreviations(text, canonical):
+    assert normalize(text) == canonical
+
+
+@pytest.mark.parametrize("text", [
+    "Proverbs 3:5–6",        # en dash
+    "Proverbs 3:5 — 6",      # em dash with spaces
+    "Proverbs 3:5â€“6",  # UTF-8 en dash read as cp1252
+])
+def test_dashes_and_mojibake(text):
+    assert normalize(text) == "Proverbs 3:5-6"
+
+
+@pytest.mark.parametrize("text, canonical", [
+    ("Jude 3", "Jude 3"),
+    ("jude 1:3", "Jude 3"),
+    ("Philemon 4-6", "Philemon 4-6"),
+    ("obad 1-4", "Obadiah 1-4"),
+    ("3 John 2", "3 John 2"),
+])
+def test_single_chapter_books(text, canonical):
+    assert normalize(text) == canonical
+
+
+@pytest.mark.parametrize("text, canonical", [
+    ("Gen 1-3", "Genesis 1-3"),
+    ("Gen 1:1-2:3", "Genesis 1:1-2:3"),
+    ("Rom 8:28, 31", "Romans 8:28, 31"),
+    ("rom 8:28,31-32", "Romans 8:28, 31-32"),
+    ("John 1:1, 3:16", "John 1:1, 3:16"),
+    ("Proverbs 3:5-6; Rom 8:28", "Proverbs 3:5-6; Romans 8:28"),
+    ("John 3:16; 4:1", "John 3:16; John 4:1"),
+])
+def test_ranges_and_lists(text, canonical):
+    assert normalize(text) == canonical
+
+
+def test_parse_structure():
+    (passage,) = parse("Rom 8:28, 31")
+    assert passage.book == "Romans"
+    assert passage.segments == (Segment(8, 28, 8, 28), Segment(8, 31, 8, 31))
+
+
+# -----------------------------
+#  INVALID INPUT
+# -----------------------------
+@pytest.mark.parametrize("text", [
+    "Foo 3:16",       # unknown book
+    "John 22:1",      # past the last chapter
+    "John 3:0",       # verse zero
+    "John 3:5-3:2",   # backwards range
+    "3:16",           # no book
+    "",
+])
+def test_invalid_references_raise(text):
+    with pytest.raises(InvalidReference):
+        canonicalize(text)
+
+
+@pytest.mark.parametrize("text, fallback", [
+    ("  hello world ", "hello world"),
+    ("Foo 3:16", "Foo 3:16"),
+    ("John 22:1", "John 22:1"),
+    ("Notes on John 3:16â€“18 ", "Notes on John 3:16–18"),
+    ("", ""),
+])
+def test_normalize_falls_back_to_trimmed_input(text, fallback):
+    assert normalize(text) == fallback
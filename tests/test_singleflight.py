@@ -0,0 +1,73 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from singleflight import AsyncSingleFlight, SingleFlight  # noqa: E402
+
+
+def test_concurrent_calls_share_one_result():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return "text"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", fetch)))
+               for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()["shared"] < 9:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["text"] * 10
+    assert len(calls) == 1
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "shared": 9}
+
+
+def test_exception_is_raised_and_not_cached():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        flight.do("k", fail)
+
+    # The failed call is forgotten; the next one runs again.
+    assert flight.do("k", lambda: "text") == "text"
+
+
+def test_different_keys_do_not_share():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.stats()["leaders"] == 2
+
+
+def test_async_calls_share_one_task():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "text"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", fetch) for _ in range(10)))
+
+    assert asyncio.run(main()) == ["text"] * 10
+    assert len(calls) == 1
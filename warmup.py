@@ -0,0 +1,160 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from access_log import ACCESS_LOG
+from quota import BACKGROUND
+from references import InvalidReference, canonicalize, normalize
+
+
+# -----------------------------
+#  WHAT TO WARM
+# -----------------------------
+def top_requested(path, top_n):
+    """The top_n most looked-up references in a JSON-lines access log."""
+    counts = Counter()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(record, dict) or record.get("route") != "/lookup":
+                    continue  # saves say nothing about what is read
+                reference = record.get("reference")
+                if isinstance(reference, str) and reference:
+                    counts[normalize(reference)] += 1
+    except OSError:
+        return []
+    return [ref for ref, _ in counts.most_common(top_n)]
+
+
+def warmup_references(store, access_log=ACCESS_LOG, top_n=200):
+    """
+    Every annotated reference, then the most requested ones. References
+    that don't parse are left out: ESV would drop them from a combined
+    query and force the whole chunk to be re-fetched one by one.
+    """
+    references = list(store.all())
+    references += top_requested(access_log, top_n)
+    return [ref for ref in dict.fromkeys(references) if is_valid(ref)]
+
+
+def is_valid(reference):
+    try:
+        canonicalize(reference)
+    except InvalidReference:
+        return False
+    return True
+
+
+# -----------------------------
+#  RATE BUDGET
+# -----------------------------
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+# -----------------------------
+#  WARM-UP
+# -----------------------------
+def warm_cache(references, fetch_many, is_cached, batch_size=20,
+               concurrency=4, rate=2.0):
+    """
+    Fetch every uncached reference with fetch_many(chunk), at most
+    `concurrency` chunks in flight and `rate` upstream calls a second.
+    Returns the number of references fetched.
+    """
+    missing = [ref for ref in references if not is_cached(ref)]
+    chunks = [missing[i:i + batch_size]
+              for i in range(0, len(missing), batch_size)]
+    limiter = RateLimiter(rate)
+
+    def run(chunk):
+        limiter.wait()
+        fetch_many(chunk)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        list(pool.map(run, chunks))
+
+    return len(missing)
+
+
+def record_quota(path):
+    """Write the quota this process has used, per window, to path."""
+    import esv_client
+
+    used = {window["period"]: window["used"]
+            for window in esv_client.quota.usage()["windows"]}
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(used, f)
+    os.replace(tmp, path)
+
+
+def run():
+    """
+    Fill the shared SQLite passage cache before the server takes
+    traffic. gunicorn.conf.py runs this as `python warmup.py`; workers
+    find the results on disk.
+    """
+    import server
+    from passage_cache import make_key
+
+    if server.local_corpus is not None or server.passage_cache.backend is None:
+        # Local text needs no warming, and a memory-only cache would
+        # not outlive this process.
+        return 0
+
+    references = warmup_references(
+        server.interpretation_store,
+        top_n=int(os.environ.get("WARMUP_TOP_N", 200)),
+    )
+
+    def is_cached(reference):
+        return server.passage_cache.get(make_key(reference, server.ESV_PARAMS)) is not None
+
+    # gunicorn.conf.py charges what this process spends to the workers.
+    quota_file = os.environ.get("WARMUP_QUOTA_FILE")
+    quota_lock = threading.Lock()
+
+    def fetch_many(chunk):
+        # Background priority: warm-up never eats the interactive reserve.
+        server.fetch_bible_verses(chunk, priority=BACKGROUND)
+        if quota_file:
+            with quota_lock:
+                record_quota(quota_file)
+
+    started = time.monotonic()
+    fetched = warm_cache(
+        references,
+        fetch_many,
+        is_cached,
+        batch_size=server.ESV_BATCH_MAX,
+        concurrency=int(os.environ.get("WARMUP_CONCURRENCY", 4)),
+        rate=float(os.environ.get("WARMUP_RATE", 2)),
+    )
+    print(f"Warm-up: {len(references)} references, {fetched} fetched "
+          f"in {time.monotonic() - started:.1f}s")
+    return fetched
+
+
+if __name__ == "__main__":
+    run()